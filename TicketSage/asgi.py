@@ -13,4 +13,6 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'TicketSage.settings')
 
-application = get_asgi_application()
+from base.asgi import DisconnectMiddleware
+
+application = DisconnectMiddleware(get_asgi_application())
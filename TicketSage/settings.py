@@ -43,7 +43,7 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "base.authentication.CachedTokenAuthentication",
     ],
 }
 
@@ -62,6 +62,8 @@ ACCOUNT_EMAIL_VERIFICATION = None
 
 
 MIDDLEWARE = [
+    # First, so the recorded latency covers every other middleware
+    "base.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -106,6 +108,61 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": config(
+            "CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": config("CACHE_LOCATION", default=""),
+    }
+}
+
+# Seconds a showtime's seat availability bitmap stays cached. Bookings drop it from the default
+# cache, which has to be shared by all workers for them to see it (check --deploy fails on LocMemCache).
+SEAT_MAP_CACHE_TIMEOUT = config("SEAT_MAP_CACHE_TIMEOUT", default=300, cast=int)
+
+# Seconds a rendered now-showing listing is served from the cache
+NOW_SHOWING_CACHE_TIMEOUT = config("NOW_SHOWING_CACHE_TIMEOUT", default=60, cast=int)
+
+# Seconds a seat stays held for a customer before it is released back to sale
+SEAT_HOLD_TTL = config("SEAT_HOLD_TTL", default=300, cast=int)
+# Seats one customer may hold at once for a showtime, so no account can hold a whole hall
+SEAT_HOLD_LIMIT = config("SEAT_HOLD_LIMIT", default=10, cast=int)
+
+# Seconds a token's user is served from the cache instead of the database
+AUTH_TOKEN_CACHE_TIMEOUT = config("AUTH_TOKEN_CACHE_TIMEOUT", default=300, cast=int)
+
+# Seconds seat events are kept for reconnecting watchers, and how many they may catch up on.
+# Seat events are streamed under /async/ by an ASGI server (TicketSage.asgi) and published to the
+# default cache, which has to be shared by all workers (check --deploy fails on LocMemCache).
+# TicketSage.asgi ends the streams of disconnected watchers, other entry points keep polling
+# until SEAT_EVENTS_STREAM_TIMEOUT.
+SEAT_EVENTS_TTL = config("SEAT_EVENTS_TTL", default=300, cast=int)
+SEAT_EVENTS_BACKLOG = config("SEAT_EVENTS_BACKLOG", default=200, cast=int)
+# Seconds between checks for seat events, between keep-alives, and before a stream is recycled
+SEAT_EVENTS_POLL_INTERVAL = config("SEAT_EVENTS_POLL_INTERVAL", default=1, cast=float)
+SEAT_EVENTS_HEARTBEAT = config("SEAT_EVENTS_HEARTBEAT", default=15, cast=int)
+SEAT_EVENTS_STREAM_TIMEOUT = config("SEAT_EVENTS_STREAM_TIMEOUT", default=300, cast=int)
+
+# Items per page of the cursor-paginated list endpoints
+PAGE_SIZE = config("PAGE_SIZE", default=20, cast=int)
+
+# Upcoming showtimes embedded in a movie's details, the rest are paged under /movies/<id>/showtimes/
+MOVIE_SHOWTIMES_LIMIT = config("MOVIE_SHOWTIMES_LIMIT", default=20, cast=int)
+
+# Showtime scheduling engine ("greedy" or "packing") and how it weighs movies (rating, occupancy or none)
+SHOWTIME_PLANNER = config("SHOWTIME_PLANNER", default="greedy")
+SHOWTIME_PLANNER_WEIGHTING = config("SHOWTIME_PLANNER_WEIGHTING", default=None)
+
+# Log every request's latency and SQL usage as a JSON line, and the token /metrics/ scrapers must send.
+# Without a token /metrics/ is only served with DEBUG on.
+REQUEST_METRICS_LOG = config("REQUEST_METRICS_LOG", default=False, cast=bool)
+METRICS_TOKEN = config("METRICS_TOKEN", default=None)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -164,6 +221,18 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # TMDB
 TMDB_key = config("TMDB_KEY")
+TMDB_API_URL = config("TMDB_API_URL", default="https://api.themoviedb.org/3")
+TMDB_TIMEOUT = config("TMDB_TIMEOUT", default=10, cast=float)  # seconds per request
+TMDB_MAX_WORKERS = config("TMDB_MAX_WORKERS", default=8, cast=int)  # concurrent detail fetches
+TMDB_RETRIES = config("TMDB_RETRIES", default=3, cast=int)
+TMDB_MAX_PAGES = config("TMDB_MAX_PAGES", default=500, cast=int)  # TMDB serves at most 500 pages
+# On-disk response cache, set TMDB_CACHE_DIR to an empty value to disable it
+TMDB_CACHE_DIR = config("TMDB_CACHE_DIR", default=str(BASE_DIR / ".tmdb_cache"))
+TMDB_CACHE_MAX_BYTES = config("TMDB_CACHE_MAX_BYTES", default=50 * 1024 * 1024, cast=int)
+TMDB_CACHE_TTLS = {  # seconds a response is served without revalidation, by path prefix
+    "/movie/now_playing": 60 * 60,
+    "/movie/": 24 * 60 * 60,
+}
 
 SITE_ID = 1
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Booking, Cinema, Movie, Seat, Showtime, Payment
+from .models import Booking, Cinema, Movie, Seat, SeatHold, Showtime, Payment
 
 admin.site.register(Booking)
 admin.site.register(Cinema)
@@ -7,6 +7,7 @@ admin.site.register(Cinema)
 admin.site.register(Seat)
 admin.site.register(Showtime)
 admin.site.register(Payment)
+admin.site.register(SeatHold)
 
 
 class MovieAdmin(admin.ModelAdmin):
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class BaseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'base'
+
+    def ready(self):
+        # Connects the receivers that invalidate cached token lookups
+        from . import authentication  # noqa: F401
+        # Registers the deployment checks of the app
+        from . import checks  # noqa: F401
@@ -0,0 +1,45 @@
+import asyncio
+
+# Scope key of the asyncio.Event set once the client of an HTTP request has gone away
+DISCONNECTED = "ticketsage.disconnected"
+
+
+class DisconnectMiddleware:
+    """
+    ASGI middleware telling views when their client disconnects.
+
+    Django 4.2 stops reading from the connection once it has the request body, so a streaming
+    response never learns that its client left and keeps generating until it ends by itself. This
+    keeps listening after the body for http.disconnect and sets the event stored in the scope.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        disconnected = asyncio.Event()
+        body_read = asyncio.Event()
+
+        async def receive_body():
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+            elif not message.get("more_body", False):
+                body_read.set()
+            return message
+
+        async def watch():
+            # Django no longer calls receive() past the body, so this is the only reader left
+            await body_read.wait()
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        watcher = asyncio.create_task(watch())
+        try:
+            await self.app({**scope, DISCONNECTED: disconnected}, receive_body, send)
+        finally:
+            watcher.cancel()
@@ -0,0 +1,142 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from .asgi import DISCONNECTED
+from .catalogue import aget_catalogue_version
+from .events import aevents_since, alast_event_id, format_event
+from .models import Movie, Showtime
+from .pagination import MovieCursorPagination
+from .seatmap import SeatMap
+from .serializers import MovieDetailSerializer, ShowtimeDetailSerializer, movie_list_values_serializer
+from .views import (
+    NOW_SHOWING_CACHE_TIMEOUT,
+    build_listing,
+    conditional_listing_response,
+    now_showing_cache_key,
+    now_showing_movies,
+)
+import asyncio
+import time
+
+# Seconds between checks for new seat events, between keep-alive comments, and before a stream is
+# closed for the client to reconnect with Last-Event-ID
+SEAT_EVENTS_POLL_INTERVAL = getattr(settings, "SEAT_EVENTS_POLL_INTERVAL", 1)
+SEAT_EVENTS_HEARTBEAT = getattr(settings, "SEAT_EVENTS_HEARTBEAT", 15)
+SEAT_EVENTS_STREAM_TIMEOUT = getattr(settings, "SEAT_EVENTS_STREAM_TIMEOUT", 300)
+
+
+def json_response(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type="application/json")
+
+
+def not_found():
+    # Same body as the DRF views answer with
+    return json_response({"detail": "Not found."}, status=404)
+
+
+class AsyncMovieListView(View):
+    """
+    Async version of MovieListView, serving the same cached and paginated listing.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        version = await aget_catalogue_version()
+        cache_key = now_showing_cache_key(version, request)
+        listing = await cache.aget(cache_key)
+        if listing is None:
+            paginator = MovieCursorPagination()
+            page = await paginator.apaginate_queryset(
+                now_showing_movies().values(*movie_list_values_serializer.columns), Request(request)
+            )
+            listing = build_listing(paginator.get_paginated_response(movie_list_values_serializer.many(page)).data)
+            await cache.aset(cache_key, listing, NOW_SHOWING_CACHE_TIMEOUT)
+
+        return conditional_listing_response(request, listing, json_response)
+
+
+class AsyncMovieDetailView(View):
+    """
+    Async version of MovieDetailView.
+    """
+
+    async def get(self, request, pk, *args, **kwargs):
+        try:
+            movie = await Movie.objects.aget(pk=pk)
+        except Movie.DoesNotExist:
+            return not_found()
+        showtimes = [showtime async for showtime in MovieDetailSerializer.upcoming_showtimes(movie)]
+        return json_response(MovieDetailSerializer(movie, context={"showtimes": showtimes}).data)
+
+
+class AsyncShowtimeDetailView(View):
+    """
+    Async version of the read side of ShowtimeDetailView, bookings still go through the latter.
+    """
+
+    async def get(self, request, pk, *args, **kwargs):
+        try:
+            showtime = await Showtime.objects.select_related("cinema", "movie").aget(pk=pk)
+        except Showtime.DoesNotExist:
+            return not_found()
+        seat_map = await SeatMap.afor_showtime(showtime)
+        return json_response(ShowtimeDetailSerializer(showtime, context={"seat_map": seat_map}).data)
+
+
+class SeatEventsView(View):
+    """
+    Server-Sent Events stream of seat availability changes for a showtime (booked, released,
+    held and unheld seats), so watchers keep their seat map current without refetching it.
+
+    Events come from the showtime's event log in the cache, never the database, and a client
+    reconnecting with Last-Event-ID gets what it missed, or a reset event telling it to fetch
+    the seat map again when that is no longer available.
+
+    Streams are only served under ASGI. WSGI servers collect the whole response before sending
+    it, which would hold a worker for the stream's lifetime and deliver every event at its end.
+    The event log has to live in a cache shared by all workers (see checks.check_shared_cache).
+    Streams stop as soon as their watcher disconnects when the application is wrapped in
+    asgi.DisconnectMiddleware, as TicketSage.asgi does.
+    """
+
+    async def get(self, request, pk, *args, **kwargs):
+        if isinstance(request, WSGIRequest):
+            return json_response({"detail": "Seat events are only streamed by ASGI servers."}, status=501)
+        if not await Showtime.objects.filter(pk=pk).aexists():
+            return not_found()
+
+        last_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+        try:
+            last_id = int(last_id)
+        except (TypeError, ValueError):
+            # New watchers only get what happens from now on
+            last_id = await alast_event_id(pk)
+
+        # Set by DisconnectMiddleware, without it the stream only ends on its timeout
+        disconnected = request.scope.get(DISCONNECTED) or asyncio.Event()
+        response = StreamingHttpResponse(self.stream(pk, last_id, disconnected), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # keep proxies such as nginx from buffering the stream
+        return response
+
+    async def stream(self, showtime_id, last_id, disconnected):
+        started = last_sent = time.monotonic()
+        yield f"retry: {int(SEAT_EVENTS_POLL_INTERVAL * 1000)}\n\n"
+        while not disconnected.is_set():
+            for event in await aevents_since(showtime_id, last_id):
+                last_id = event["id"]
+                last_sent = time.monotonic()
+                yield format_event(event)
+            now = time.monotonic()
+            if now - started >= SEAT_EVENTS_STREAM_TIMEOUT:
+                return
+            if now - last_sent >= SEAT_EVENTS_HEARTBEAT:
+                last_sent = now
+                yield ": keep-alive\n\n"
+            try:
+                await asyncio.wait_for(disconnected.wait(), SEAT_EVENTS_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from dj_rest_auth.models import TokenModel
+from rest_framework.authentication import TokenAuthentication
+import hashlib
+
+AUTH_TOKEN_CACHE_TIMEOUT = getattr(settings, "AUTH_TOKEN_CACHE_TIMEOUT", 300)
+
+
+def _cache_key(key):
+    # Hashed so raw tokens never show up in the cache's key space
+    return f"authtoken:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that keeps token to user resolutions in the cache, so authenticated
+    requests skip the Token and User lookup. Entries expire after AUTH_TOKEN_CACHE_TIMEOUT
+    seconds and are dropped as soon as the token is deleted (logout) or its user is saved
+    (password change, deactivation).
+    """
+
+    model = TokenModel
+
+    def authenticate_credentials(self, key):
+        token = cache.get(_cache_key(key))
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(_cache_key(key), token, AUTH_TOKEN_CACHE_TIMEOUT)
+        return (token.user, token)
+
+
+@receiver(post_delete, sender=TokenModel)
+def forget_deleted_token(sender, instance, **kwargs):
+    cache.delete(_cache_key(instance.key))
+
+
+@receiver(post_save, sender=User)
+def forget_user_tokens(sender, instance, created, **kwargs):
+    # Logins only touch last_login, which cached resolutions do not depend on
+    if created or kwargs.get("update_fields") == frozenset({"last_login"}):
+        return
+    keys = TokenModel.objects.filter(user=instance).values_list("key", flat=True)
+    cache.delete_many([_cache_key(key) for key in keys])
@@ -0,0 +1,33 @@
+from django.core.cache import cache
+import time
+
+CATALOGUE_VERSION_KEY = "catalogue:version"
+
+
+def get_catalogue_version():
+    """
+    Returns the current catalogue version, the timestamp of the last movie or showtime update.
+    """
+    version = cache.get(CATALOGUE_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOGUE_VERSION_KEY, time.time(), None)
+        version = cache.get(CATALOGUE_VERSION_KEY)
+    return version
+
+
+async def aget_catalogue_version():
+    """
+    Async version of get_catalogue_version().
+    """
+    version = await cache.aget(CATALOGUE_VERSION_KEY)
+    if version is None:
+        await cache.aadd(CATALOGUE_VERSION_KEY, time.time(), None)
+        version = await cache.aget(CATALOGUE_VERSION_KEY)
+    return version
+
+
+def bump_catalogue_version():
+    """
+    Marks the catalogue as changed so cached listings built from an older version are no longer served.
+    """
+    cache.set(CATALOGUE_VERSION_KEY, time.time(), None)
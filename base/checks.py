@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Cache backends whose entries are private to each process
+PER_PROCESS_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Seat events and seat map bitmaps live in the default cache, so with a per-process cache a
+    booking handled by one worker is neither pushed to the watchers connected to another nor
+    shown in the seat maps it serves.
+    """
+    backend = settings.CACHES.get("default", {}).get("BACKEND")
+    if backend not in PER_PROCESS_CACHES:
+        return []
+    return [
+        Error(
+            f"The default cache ({backend}) is not shared between processes.",
+            hint="Seat events and seat maps need a cache every worker sees, such as Redis or Memcached (CACHE_BACKEND).",
+            id="base.E001",
+        )
+    ]
@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.cache import cache
+import json
+
+SEAT_EVENTS_TTL = getattr(settings, "SEAT_EVENTS_TTL", 300)
+SEAT_EVENTS_BACKLOG = getattr(settings, "SEAT_EVENTS_BACKLOG", 200)
+
+# Seat availability changes pushed to watchers of a showtime
+BOOKED = "booked"
+RELEASED = "released"
+HELD = "held"
+UNHELD = "unheld"
+# Tells a watcher that it missed events and has to fetch the whole seat map again
+RESET = "reset"
+
+
+def _sequence_key(showtime_id):
+    return f"seatevents:{showtime_id}:seq"
+
+
+def _event_key(showtime_id, event_id):
+    return f"seatevents:{showtime_id}:{event_id}"
+
+
+def publish(showtime_id, event_type, seat_ids, **data):
+    """
+    Appends a seat availability change to the showtime's event log and returns its ID.
+
+    The log lives in the cache: a counter numbers the events of each showtime and every event
+    is kept for SEAT_EVENTS_TTL seconds, enough for watchers to catch up after reconnecting.
+    """
+    sequence_key = _sequence_key(showtime_id)
+    cache.add(sequence_key, 0, None)
+    event_id = cache.incr(sequence_key)
+    event = {"id": event_id, "type": event_type, "seats": sorted(seat_ids), **data}
+    cache.set(_event_key(showtime_id, event_id), event, SEAT_EVENTS_TTL)
+    return event_id
+
+
+async def alast_event_id(showtime_id):
+    return await cache.aget(_sequence_key(showtime_id)) or 0
+
+
+async def aevents_since(showtime_id, last_id):
+    """
+    Returns the events of the showtime after last_id, or a single reset event when some of them
+    are no longer available.
+    """
+    current = await alast_event_id(showtime_id)
+    if current == last_id:
+        return []
+    reset = [{"id": current, "type": RESET}]
+    if last_id > current or current - last_id > SEAT_EVENTS_BACKLOG:
+        return reset
+    keys = [_event_key(showtime_id, event_id) for event_id in range(last_id + 1, current + 1)]
+    events = await cache.aget_many(keys)
+    if len(events) < len(keys):
+        # Some expired or were evicted before the watcher came back for them
+        return reset
+    return [events[key] for key in keys]
+
+
+def format_event(event):
+    """
+    Formats an event as a Server-Sent Events message.
+    """
+    data = {key: value for key, value in event.items() if key not in ("id", "type")}
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(data)}\n\n"
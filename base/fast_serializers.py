@@ -0,0 +1,54 @@
+from rest_framework import serializers
+
+
+class ValuesSerializer:
+    """
+    Read-only serializer for the rows of ``QuerySet.values()``, compiled once from a DRF serializer.
+
+    The DRF serializer is walked once, nested serializers included, to list the columns to select
+    and the field instances that format them. Rows are then turned into dicts by calling those
+    fields' ``to_representation`` directly, so the output is the same as the DRF serializer's while
+    skipping its per-instance setup and attribute lookups.
+
+    Fields that are not plain columns, such as method fields and model properties, are given in
+    ``computed`` as ``function(row, context)`` keyed by their path (``"seat__seat_number"``), and
+    the columns they read in ``extra_columns``.
+    """
+
+    def __init__(self, serializer_class, computed=None, extra_columns=()):
+        self.computed = computed or {}
+        self.columns = []
+        self.fields = self._compile(serializer_class(), "")
+        self.columns += [column for column in extra_columns if column not in self.columns]
+
+    def _compile(self, serializer, prefix):
+        compiled = []
+        for field in serializer._readable_fields:
+            path = prefix + field.source.replace(".", "__")
+            if prefix + field.field_name in self.computed:
+                compiled.append((field.field_name, None, self.computed[prefix + field.field_name], None))
+            elif isinstance(field, serializers.BaseSerializer):
+                compiled.append((field.field_name, path, None, self._compile(field, path + "__")))
+            else:
+                self.columns.append(path)
+                compiled.append((field.field_name, path, field.to_representation, None))
+        return compiled
+
+    def _represent(self, fields, row, context):
+        data = {}
+        for name, path, to_representation, nested in fields:
+            if nested is not None:
+                data[name] = self._represent(nested, row, context)
+            elif path is None:
+                data[name] = to_representation(row, context)
+            else:
+                # None is passed through untouched, as DRF serializers do
+                value = row[path]
+                data[name] = None if value is None else to_representation(value)
+        return data
+
+    def to_representation(self, row, context=None):
+        return self._represent(self.fields, row, context)
+
+    def many(self, rows, context=None):
+        return [self._represent(self.fields, row, context) for row in rows]
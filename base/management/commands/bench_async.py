@@ -0,0 +1,61 @@
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.test import AsyncClient
+from base.metrics import registry
+from .bench_endpoints import Command as EndpointsCommand, SCENARIOS, summarize
+import asyncio
+import random
+import time
+
+# Read endpoints served both by the DRF views and by their async versions under /async/
+READ_SCENARIOS = ("movie-list", "movie-detail", "showtime-detail")
+
+
+class Command(EndpointsCommand):
+    help = (
+        'Seeds a throwaway test database and compares the throughput of the read endpoints on the '
+        'WSGI path (threads) with their async versions on the ASGI path (one event loop).'
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        scenario = next(action for action in parser._actions if action.dest == 'scenario')
+        scenario.choices = list(READ_SCENARIOS)
+
+    def run_scenarios(self, options):
+        data = self.seed(options)
+        results = {}
+        for name in options['scenario'] or READ_SCENARIOS:
+            results[f"{name} wsgi"] = self.run_scenario(SCENARIOS[name], data, options)
+            results[f"{name} asgi"] = asyncio.run(self.run_async_scenario(SCENARIOS[name], data, options))
+        return results
+
+    async def run_async_scenario(self, scenario, data, options):
+        concurrency = options['concurrency']
+        shares = self.shares(options)
+
+        async def client_worker(worker):
+            rng = random.Random(options['seed'] * 1000 + worker)
+            client = AsyncClient()
+            samples = []
+            for _ in range(shares[worker]):
+                method, path, payload = scenario(data, rng)
+                request_started = time.perf_counter()
+                response = await getattr(client, method)(f"/async{path}", payload)
+                samples.append((time.perf_counter() - request_started, None, response.status_code))
+            return samples
+
+        # Query counts come from the metrics middleware, whose recorder follows the async ORM
+        registry.reset()
+        started = time.perf_counter()
+        workers = await asyncio.gather(*(client_worker(worker) for worker in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        await sync_to_async(connections.close_all)()
+
+        queries = sum(histogram.sum for histogram in registry.queries.values())
+        samples = [
+            (latency, queries / max(sum(shares), 1), status_code)
+            for worker in workers
+            for latency, _, status_code in worker
+        ]
+        return summarize(samples, elapsed)
@@ -0,0 +1,102 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+from base.models import Booking, Cinema, Movie, Seat, Showtime
+from base.serializers import ShowtimeDetailSerializer
+from rest_framework.exceptions import ValidationError
+from .bench_endpoints import bench_database
+import random
+import time
+
+
+class Command(BaseCommand):
+    help = "Benchmarks concurrent bookings against a single showtime and checks for double-bookings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Number of concurrent buyers.')
+        parser.add_argument('--attempts', type=int, default=50, help='Booking attempts per buyer.')
+        parser.add_argument('--rows', type=int, default=10, help='Rows in the benchmark hall.')
+        parser.add_argument('--seats-per-row', type=int, default=20, help='Seats per row in the benchmark hall.')
+        parser.add_argument('--group-size', type=int, default=2, help='Seats requested per booking.')
+
+    def handle(self, *args, **options):
+        # Runs against a throwaway database, so an interrupted run leaves nothing behind
+        with bench_database():
+            self.benchmark(options)
+
+    def benchmark(self, options):
+        cinema = Cinema.objects.create(
+            name="Benchmark Cinema",
+            rows=options['rows'],
+            seats_per_row=options['seats_per_row'],
+        )
+        movie = Movie.objects.create(
+            title="Benchmark Movie",
+            duration=timedelta(hours=2),
+            rating=0,
+            overview="",
+            poster="http://example.com/poster.jpg",
+            backdrop_path="http://example.com/backdrop.jpg",
+            tmdb_id=-random.randint(1, 2**31),  # never clashes with real TMDB IDs
+            release_date=timezone.now(),
+        )
+        start_time = timezone.now() + timedelta(days=1)
+        showtime = Showtime.objects.create(
+            cinema=cinema, movie=movie, start_time=start_time, end_time=start_time + movie.duration
+        )
+        users = [
+            User.objects.create_user(username=f"bench-booking-{showtime.pk}-{i}")
+            for i in range(options['threads'])
+        ]
+        seat_ids = list(Seat.objects.filter(cinema=cinema).values_list("id", flat=True))
+
+        def buyer(user):
+            booked = conflicts = errors = 0
+            try:
+                for _ in range(options['attempts']):
+                    seats = random.sample(seat_ids, options['group_size'])
+                    serializer = ShowtimeDetailSerializer(
+                        showtime, data={"book_seat": seats}, partial=True, context={"user": user}
+                    )
+                    serializer.is_valid(raise_exception=True)
+                    try:
+                        serializer.save()
+                        booked += len(seats)
+                    except ValidationError:
+                        conflicts += 1
+                    except Exception:
+                        # e.g. lock timeouts on backends that serialize writers
+                        errors += 1
+            finally:
+                connection.close()
+            return booked, conflicts, errors
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            results = list(executor.map(buyer, users))
+        elapsed = time.perf_counter() - started
+
+        booked = sum(result[0] for result in results)
+        conflicts = sum(result[1] for result in results)
+        errors = sum(result[2] for result in results)
+        stored = Booking.objects.filter(showtime=showtime).count()
+        double_booked = (
+            Booking.objects.filter(showtime=showtime)
+            .values("seat")
+            .annotate(count=Count("id"))
+            .filter(count__gt=1)
+            .count()
+        )
+
+        self.stdout.write(f"Threads: {options['threads']}, attempts: {options['threads'] * options['attempts']}")
+        self.stdout.write(f"Seats booked: {booked} ({stored} rows stored) in {elapsed:.2f}s")
+        self.stdout.write(f"Throughput: {booked / elapsed:.1f} bookings/sec")
+        self.stdout.write(f"Conflicts rejected: {conflicts}, errors: {errors}")
+        if double_booked or stored != booked:
+            self.stdout.write(self.style.ERROR(f"Double-booked seats: {double_booked}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Double-booked seats: 0"))
@@ -0,0 +1,248 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from dj_rest_auth.models import TokenModel
+from rest_framework.test import APIClient
+from base.models import Seat
+from base.seeding import seed_catalogue
+import json
+import logging
+import random
+import statistics
+import tempfile
+import time
+import uuid
+
+
+def movie_list(data, rng):
+    return "get", "/movies/", None
+
+
+def movie_detail(data, rng):
+    return "get", f"/movies/{rng.choice(data['movies'])}/", None
+
+
+def showtime_detail(data, rng):
+    showtime_id, _ = rng.choice(data['showtimes'])
+    return "get", f"/showtimes/{showtime_id}/", None
+
+
+def booking(data, rng):
+    showtime_id, cinema_id = rng.choice(data['showtimes'])
+    return "patch", f"/showtimes/{showtime_id}/", {"book_seat": [rng.choice(data['seats'][cinema_id])]}
+
+
+# Benchmarked endpoints by name, each building (method, path, payload) for one request
+SCENARIOS = {
+    "movie-list": movie_list,
+    "movie-detail": movie_detail,
+    "showtime-detail": showtime_detail,
+    "booking": booking,
+}
+
+
+def percentile(latencies, percent):
+    if len(latencies) < 2:
+        return latencies[0] if latencies else 0.0
+    return statistics.quantiles(latencies, n=100, method="inclusive")[percent - 1]
+
+
+def summarize(samples, elapsed):
+    """
+    Sums up (latency, queries, status code) samples of requests run over the elapsed seconds.
+    """
+    latencies = [latency * 1000 for latency, _, _ in samples]
+    statuses = {}
+    for _, _, status_code in samples:
+        statuses[str(status_code)] = statuses.get(str(status_code), 0) + 1
+    return {
+        "requests": len(samples),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "throughput": len(samples) / elapsed if elapsed else 0.0,
+        "queries": statistics.mean(queries for _, queries, _ in samples) if samples else 0.0,
+        "statuses": statuses,
+    }
+
+
+@contextmanager
+def bench_database():
+    """
+    Runs the block against a throwaway test database and a namespaced cache, never the real data.
+    """
+    caches = {
+        alias: {**config, "KEY_PREFIX": f"bench-{uuid.uuid4().hex}"}
+        for alias, config in settings.CACHES.items()
+    }
+    test_settings = connection.settings_dict.setdefault("TEST", {})
+    old_test_name = test_settings.get("NAME")
+    with tempfile.TemporaryDirectory() as directory:
+        if connection.vendor == "sqlite" and not old_test_name:
+            # A file lets every client thread open its own connection without shared-cache locking
+            test_settings["NAME"] = f"{directory}/bench.sqlite3"
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(CACHES=caches):
+                yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            test_settings["NAME"] = old_test_name
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a throwaway test database and load-tests the API endpoints through the test client, '
+        'reporting latency percentiles, throughput and SQL queries per request.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cinemas', type=int, default=10, help='Number of cinemas to seed.')
+        parser.add_argument('--rows', type=int, default=15, help='Rows in every seeded hall.')
+        parser.add_argument('--seats-per-row', type=int, default=20, help='Seats per row in every seeded hall.')
+        parser.add_argument('--movies', type=int, default=30, help='Number of movies to seed.')
+        parser.add_argument('--days', type=int, default=7, help='Days of showtimes to schedule.')
+        parser.add_argument('--users', type=int, default=50, help='Number of customers to seed.')
+        parser.add_argument('--bookings', type=int, default=10000, help='Number of bookings to seed.')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario.')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients per scenario.')
+        parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), help='Scenario to run, can be repeated. Defaults to all.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the data and the requests.')
+        parser.add_argument('--save', help='Write the results as a JSON baseline to this file.')
+        parser.add_argument('--compare', help='Compare the results with a JSON baseline saved earlier.')
+        parser.add_argument('--max-regression', type=float, default=None, help='Fail when a p95 latency grows by more than this percentage over the baseline.')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)
+
+        with bench_database():
+            results = self.run_scenarios(options)
+
+        self.report(results, baseline)
+        if options['save']:
+            with open(options['save'], "w") as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+            self.stdout.write(f"Baseline saved to {options['save']}")
+
+        if baseline and options['max_regression'] is not None:
+            regressed = [
+                name
+                for name, result in results.items()
+                if name in baseline
+                and result['p95_ms'] > baseline[name]['p95_ms'] * (1 + options['max_regression'] / 100)
+            ]
+            if regressed:
+                raise CommandError(f"p95 latency regressed in: {', '.join(regressed)}")
+
+    def seed(self, options):
+        seeded = seed_catalogue(
+            cinemas=options['cinemas'],
+            rows=options['rows'],
+            seats_per_row=options['seats_per_row'],
+            movies=options['movies'],
+            days=options['days'],
+            users=options['users'],
+            bookings=options['bookings'],
+            seed=options['seed'],
+        )
+        if not seeded['showtimes']:
+            raise CommandError('Nothing was scheduled, so there is nothing to benchmark.')
+        TokenModel.objects.bulk_create(
+            TokenModel(user=user, key=TokenModel.generate_key()) for user in seeded['users']
+        )
+        seats = {}
+        for seat_id, cinema_id in Seat.objects.filter(cinema__in=seeded['cinemas']).values_list("id", "cinema_id"):
+            seats.setdefault(cinema_id, []).append(seat_id)
+        return {
+            "movies": [movie.pk for movie in seeded['movies']],
+            "showtimes": [(showtime.pk, showtime.cinema_id) for showtime in seeded['showtimes']],
+            "seats": seats,
+            "tokens": list(TokenModel.objects.values_list("key", flat=True)),
+        }
+
+    def run_scenarios(self, options):
+        started = time.perf_counter()
+        data = self.seed(options)
+        self.stdout.write(
+            f"Seeded {len(data['movies'])} movies and {len(data['showtimes'])} showtimes "
+            f"with {options['bookings']} bookings in {time.perf_counter() - started:.1f}s"
+        )
+
+        # Rejected bookings are expected under contention, so keep their warnings out of the report
+        request_logger = logging.getLogger("django.request")
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            results = {}
+            for name in options['scenario'] or SCENARIOS:
+                results[name] = self.run_scenario(SCENARIOS[name], data, options)
+        finally:
+            request_logger.setLevel(level)
+        return results
+
+    def shares(self, options):
+        # Spread the requests over the clients, each with its own random stream and customer
+        concurrency = options['concurrency']
+        return [
+            options['requests'] // concurrency + (i < options['requests'] % concurrency)
+            for i in range(concurrency)
+        ]
+
+    def run_scenario(self, scenario, data, options):
+        concurrency = options['concurrency']
+        shares = self.shares(options)
+
+        def client_worker(worker):
+            rng = random.Random(options['seed'] * 1000 + worker)
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION="Token " + data['tokens'][worker % len(data['tokens'])])
+            samples = []
+            try:
+                for _ in range(shares[worker]):
+                    method, path, payload = scenario(data, rng)
+                    with CaptureQueriesContext(connection) as queries:
+                        request_started = time.perf_counter()
+                        response = getattr(client, method)(path, payload, format="json")
+                        latency = time.perf_counter() - request_started
+                    samples.append((latency, len(queries), response.status_code))
+            finally:
+                connection.close()
+            return samples
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            samples = [sample for worker in executor.map(client_worker, range(concurrency)) for sample in worker]
+        elapsed = time.perf_counter() - started
+        return summarize(samples, elapsed)
+
+    def report(self, results, baseline=None):
+        self.stdout.write(
+            f"{'scenario':<22} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'req/s':>8} {'queries':>8}  statuses"
+        )
+        for name, result in results.items():
+            statuses = ", ".join(f"{code}: {count}" for code, count in sorted(result['statuses'].items()))
+            self.stdout.write(
+                f"{name:<22} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+                f"{result['throughput']:>8.1f} {result['queries']:>8.1f}  {statuses}"
+            )
+            if baseline and name in baseline:
+                before = baseline[name]
+                changes = ", ".join(
+                    f"{metric} {(result[metric] - before[metric]) / before[metric]:+.1%}"
+                    for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput", "queries")
+                    if before.get(metric)
+                )
+                self.stdout.write(f"{'':<22} vs baseline: {changes}")
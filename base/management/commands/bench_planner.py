@@ -0,0 +1,34 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from base.scheduling import PLANNERS, first_day_start, utilization
+import random
+import time
+
+
+class Command(BaseCommand):
+    help = 'Compares the showtime planners on synthetic cinemas by utilization and planning time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cinemas', type=int, default=50, help='Number of cinemas to plan.')
+        parser.add_argument('--movies', type=int, default=12, help='Movies showing in each cinema.')
+        parser.add_argument('--days', type=int, default=7, help='Number of days to plan.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic catalogue.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        start_time = first_day_start(timezone.now())
+        catalogues = [
+            [(i, timedelta(minutes=rng.randint(80, 190))) for i in range(options['movies'])]
+            for _ in range(options['cinemas'])
+        ]
+        weights = {i: rng.uniform(4, 9) for i in range(options['movies'])}
+
+        self.stdout.write(f"{'planner':<10} {'utilization':>12} {'screenings':>11} {'time (ms)':>10}")
+        for name, planner in PLANNERS.items():
+            started = time.perf_counter()
+            plans = [planner(movies, start_time, options['days'], None, weights) for movies in catalogues]
+            elapsed = time.perf_counter() - started
+            mean_utilization = sum(utilization(plan, options['days']) for plan in plans) / len(plans)
+            screenings = sum(len(plan) for plan in plans)
+            self.stdout.write(f"{name:<10} {mean_utilization:>11.1%} {screenings:>11} {elapsed * 1000:>10.1f}")
@@ -0,0 +1,110 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from rest_framework.renderers import JSONRenderer
+from base.models import Booking, Seat, Showtime
+from base.pagination import StartTimeCursorPagination
+from base.seatmap import SEAT_COLUMNS, SeatMap
+from base.seeding import seed_catalogue
+from base.serializers import (
+    BookingSerializer,
+    MovieListSerializer,
+    SeatSerializer,
+    booking_values_serializer,
+    movie_list_values_serializer,
+    seat_values_serializer,
+)
+from base.views import now_showing_movies
+from .bench_endpoints import bench_database
+import statistics
+import time
+
+
+def movie_list_cases(page_size):
+    movies = now_showing_movies()[:page_size]
+    return (
+        lambda: MovieListSerializer(movies.all(), many=True).data,
+        lambda: movie_list_values_serializer.many(movies.values(*movie_list_values_serializer.columns)),
+    )
+
+
+def seat_map_cases(page_size):
+    showtime = Showtime.objects.select_related("cinema").order_by("-cinema__rows", "-cinema__seats_per_row").first()
+    seat_map = SeatMap.for_showtime(showtime)
+    seats = Seat.objects.filter(cinema_id=showtime.cinema_id).order_by("row", "number")
+    return (
+        lambda: SeatSerializer(seats.all(), many=True, context={"seat_map": seat_map}).data,
+        lambda: seat_values_serializer.many(seats.values(*SEAT_COLUMNS), seat_map),
+    )
+
+
+def booking_cases(page_size):
+    user_id = Booking.objects.values("user").annotate(total=Count("id")).order_by("-total")[0]["user"]
+    bookings = (
+        Booking.objects.filter(user_id=user_id)
+        .select_related("showtime__movie", "showtime__cinema", "seat")
+        .order_by("showtime__start_time", "id")[:StartTimeCursorPagination.max_page_size]
+    )
+    return (
+        lambda: BookingSerializer(bookings.all(), many=True).data,
+        lambda: booking_values_serializer.many(bookings.values(*booking_values_serializer.columns)),
+    )
+
+
+# Serialized payloads by name, each building (DRF serializer, fast path) callables that load the
+# rows and serialize them
+CASES = {
+    "movie-list": movie_list_cases,
+    "seat-map": seat_map_cases,
+    "bookings": booking_cases,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a throwaway test database and compares the DRF serializers of the hot read endpoints '
+        'with their fast paths on .values() rows, checking that both render the same JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cinemas', type=int, default=5, help='Number of cinemas to seed.')
+        parser.add_argument('--rows', type=int, default=15, help='Rows in every seeded hall.')
+        parser.add_argument('--seats-per-row', type=int, default=20, help='Seats per row in every seeded hall.')
+        parser.add_argument('--movies', type=int, default=30, help='Number of movies to seed.')
+        parser.add_argument('--bookings', type=int, default=2000, help='Number of bookings to seed.')
+        parser.add_argument('--page-size', type=int, default=20, help='Movies in the listing page.')
+        parser.add_argument('--repeat', type=int, default=50, help='Timed runs of every serializer.')
+        parser.add_argument('--case', action='append', choices=list(CASES), help='Payload to run, can be repeated. Defaults to all.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the data.')
+
+    def handle(self, *args, **options):
+        with bench_database():
+            seed_catalogue(
+                cinemas=options['cinemas'],
+                rows=options['rows'],
+                seats_per_row=options['seats_per_row'],
+                movies=options['movies'],
+                users=10,
+                bookings=options['bookings'],
+                seed=options['seed'],
+            )
+            results = {name: self.run_case(name, options) for name in options['case'] or CASES}
+
+        self.stdout.write(f"{'payload':<12} {'items':>6} {'drf (ms)':>9} {'fast (ms)':>10} {'speedup':>8}")
+        for name, (items, drf, fast) in results.items():
+            self.stdout.write(f"{name:<12} {items:>6} {drf:>9.2f} {fast:>10.2f} {drf / fast:>7.1f}x")
+
+    def run_case(self, name, options):
+        drf, fast = CASES[name](options['page_size'])
+        expected, data = JSONRenderer().render(drf()), JSONRenderer().render(fast())
+        if data != expected:
+            raise CommandError(f"The fast path of {name} renders different JSON than the DRF serializer.")
+        return len(fast()), self.time(drf, options['repeat']), self.time(fast, options['repeat'])
+
+    def time(self, serialize, repeat):
+        # Median milliseconds per run, loading the rows included since that is half of the savings
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            serialize()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
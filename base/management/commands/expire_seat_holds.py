@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from base.models import SeatHold
+
+
+class Command(BaseCommand):
+    help = 'Releases expired seat holds so the seats can be sold again.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Number of holds deleted per statement.')
+
+    def handle(self, *args, **options):
+        purged = SeatHold.purge_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Released {purged} expired seat holds.'))
@@ -0,0 +1,123 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.request import Request
+from base.models import SeatHold, Showtime
+from base.scheduling import first_day_start
+from base.seatmap import bookings_queryset, holds_queryset, layout_queryset
+from base.seeding import seed_catalogue
+from base.serializers import MovieDetailSerializer, booking_values_serializer, movie_list_values_serializer
+from base.views import MovieShowtimeListView, UserMovieListView, now_showing_movies
+import re
+
+# Plan lines reading a whole table, for SQLite ("SCAN base_showtime") and PostgreSQL ("Seq Scan on base_showtime")
+FULL_SCAN = re.compile(r"\bSCAN (?P<sqlite>\w+)(?!.*\bINDEX\b)|Seq Scan on (?P<postgresql>\w+)")
+
+
+def hot_queries(sample):
+    """
+    Returns (name, queryset, tables it may scan in full) for the query shapes the API runs on
+    every request, built around the seeded sample objects. The querysets come from the views
+    and models that run them, so the check follows them when they change.
+    """
+    movie, showtime, user = sample["movie"], sample["showtime"], sample["user"]
+    request = Request(RequestFactory().get("/my-movies/"))
+    request.user = user
+    bookings = UserMovieListView(request=request, kwargs={}).get_queryset()
+    start_time = first_day_start(timezone.now())
+    return [
+        (
+            "now showing",
+            now_showing_movies().values(*movie_list_values_serializer.columns),
+            # Every movie is listed, but its showtimes must be found through the index
+            {"base_movie"},
+        ),
+        ("movie showtimes", MovieDetailSerializer.upcoming_showtimes(movie), set()),
+        (
+            "movie showtimes page",
+            MovieShowtimeListView(kwargs={"pk": movie.pk}).get_queryset().order_by("start_time", "id"),
+            set(),
+        ),
+        ("seat map layout", layout_queryset(showtime), set()),
+        ("seat map bookings", bookings_queryset(showtime), set()),
+        ("seat map holds", holds_queryset(showtime), set()),
+        ("user bookings", bookings.values(*booking_values_serializer.columns, "start_time"), set()),
+        (
+            "unbooked showtimes",
+            Showtime.unbooked(start_time=start_time, end_time=start_time + timedelta(days=7)).values_list(
+                "pk", flat=True
+            ),
+            set(),
+        ),
+        ("expired holds", SeatHold.expired().values_list("id", flat=True), set()),
+    ]
+
+
+def full_scans(plan):
+    """
+    Returns the tables a query plan reads in full.
+    """
+    return {
+        match.group("sqlite") or match.group("postgresql") for match in FULL_SCAN.finditer(plan)
+    }
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Seeds a synthetic catalogue, prints the query plan of every hot query and flags full table scans.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cinemas', type=int, default=20, help='Number of cinemas to seed.')
+        parser.add_argument('--movies', type=int, default=40, help='Number of movies to seed.')
+        parser.add_argument('--bookings', type=int, default=20000, help='Number of bookings to seed.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic catalogue.')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded data instead of rolling it back.')
+        parser.add_argument('--check', action='store_true', help='Exit with an error when a full scan is found.')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                flagged = self.explain(options)
+                if not options['keep']:
+                    raise _Rollback
+        except _Rollback:
+            pass
+
+        if flagged and options['check']:
+            raise CommandError(f"Full table scans in: {', '.join(flagged)}")
+
+    def explain(self, options):
+        seeded = seed_catalogue(
+            cinemas=options['cinemas'],
+            movies=options['movies'],
+            bookings=options['bookings'],
+            seed=options['seed'],
+        )
+        if not seeded['showtimes']:
+            raise CommandError('Nothing was scheduled, so there is nothing to explain.')
+        if connection.vendor in ('sqlite', 'postgresql'):
+            # Give the planner statistics for the seeded data
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        sample = {
+            'movie': seeded['movies'][0],
+            'showtime': seeded['showtimes'][0],
+            'user': seeded['users'][0],
+        }
+
+        flagged = []
+        for name, queryset, allowed in hot_queries(sample):
+            plan = queryset.explain()
+            scans = full_scans(plan) - allowed
+            if scans:
+                flagged.append(name)
+                self.stdout.write(self.style.ERROR(f"{name}: full scan of {', '.join(sorted(scans))}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{name}: ok"))
+            self.stdout.write(f"    {plan}".replace("\n", "\n    "))
+        return flagged
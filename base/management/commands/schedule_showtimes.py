@@ -1,23 +1,31 @@
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from datetime import timedelta
-from base.models import Showtime, Cinema, Movie, Booking
+from base.models import Showtime, Cinema
+from base.scheduling import PLANNERS
 
 class Command(BaseCommand):
-    help = 'Schedule showtimes for all available movies in the cinema.'
+    help = 'Schedule showtimes for all available movies in the cinemas, adding only the days not scheduled yet.'
 
-    # def add_arguments(self, parser):
-    #     parser.add_argument('--days', type=int, default=7, help='Number of days to schedule showtimes.')
-    #     parser.add_argument('--interval', type=int, default=3, help='Interval between consecutive showtimes in hours.')
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Number of days to schedule showtimes.')
+        parser.add_argument('--cinema', type=int, action='append', help='ID of a cinema to schedule, can be repeated. Defaults to every cinema.')
+        parser.add_argument('--reset', action='store_true', help='Replan the unbooked showtimes of the scheduled days around the booked ones, from tomorrow on.')
+        parser.add_argument('--workers', type=int, default=None, help='Plan cinemas across this many processes.')
+        parser.add_argument('--planner', choices=list(PLANNERS), help='Scheduling engine, defaults to the SHOWTIME_PLANNER setting.')
+        parser.add_argument('--weighting', choices=['rating', 'occupancy'], help='Favour movies by rating or by past occupancy.')
 
     def handle(self, *args, **options):
-        cinema = Cinema.objects.first()  # Change this to get the desired cinema for scheduling showtimes
-        # start_date = timezone.now().date()
-        # days = options['days']
-        # interval = options['interval']
+        cinemas = Cinema.objects.prefetch_related("movies")
+        if options['cinema']:
+            cinemas = cinemas.filter(pk__in=options['cinema'])
 
-        Showtime.objects.all().delete()  # Clear existing showtimes before scheduling
+        showtimes = Showtime.schedule_cinemas(
+            cinemas,
+            days=options['days'],
+            workers=options['workers'],
+            planner=options['planner'],
+            weighting=options['weighting'],
+            # Showtimes with bookings are never deleted
+            reset=options['reset'],
+        )
 
-        Showtime.create_showtimes(cinema)
-
-        self.stdout.write(self.style.SUCCESS('Showtimes have been scheduled successfully.'))
+        self.stdout.write(self.style.SUCCESS(f'{len(showtimes)} showtimes have been scheduled successfully.'))
@@ -1,10 +1,24 @@
 from django.core.management.base import BaseCommand
 from base.models import Movie
+from base.tmdb import TMDBClient
+import time
 
 
 class Command(BaseCommand):
     help = "Updates movie data from API"
 
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='Number of movie details fetched concurrently.')
+        parser.add_argument('--no-cache', action='store_true', help='Bypass the on-disk TMDB response cache.')
+
     def handle(self, *args, **options):
-        Movie.update_from_api()
+        started = time.perf_counter()
+        cache = False if options['no_cache'] else None
+        with TMDBClient(max_workers=options['workers'], cache=cache) as client:
+            Movie.update_from_api(client=client)
+        self.stdout.write(f"Sync finished in {time.perf_counter() - started:.2f}s with {client.max_workers} workers.")
+        self.stdout.write(
+            f"Network requests: {client.stats['network_requests']}, "
+            f"cache hits: {client.stats['cache_hits']}, revalidated: {client.stats['revalidated']}."
+        )
         # self.stdout.write(self.style.SUCCESS("Movie data updated successfully."))
@@ -0,0 +1,93 @@
+from bisect import bisect_left
+from collections import defaultdict
+import threading
+
+# Upper bounds of the request latency (seconds) and SQL query count histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    """
+    Cumulative histogram in the Prometheus sense: a count per bucket upper bound, plus a sum
+    and a total count.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            total += count
+            yield bound, total
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+class MetricsRegistry:
+    """
+    Per-process request metrics, keyed by view, method and status code.
+
+    Every request observes its latency and SQL query count in histograms and adds its SQL time
+    to a counter. Each server process keeps its own registry, so a scraper has to collect every
+    process behind the load balancer.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+            self.queries = defaultdict(lambda: Histogram(QUERY_BUCKETS))
+            self.sql_seconds = defaultdict(float)
+
+    def observe(self, view, method, status, latency, queries, sql_time):
+        key = (view, method, str(status))
+        with self._lock:
+            self.latency[key].observe(latency)
+            self.queries[key].observe(queries)
+            self.sql_seconds[key] += sql_time
+
+    def render(self):
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            for name, help_text, histograms in (
+                ("ticketsage_request_duration_seconds", "Request latency by view.", self.latency),
+                ("ticketsage_request_queries", "SQL queries per request by view.", self.queries),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (view, method, status), histogram in sorted(histograms.items()):
+                    labels = _labels(view=view, method=method, status=status)
+                    for bound, count in histogram.cumulative():
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                    lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+                    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+            name = "ticketsage_request_sql_seconds_total"
+            lines += [f"# HELP {name} Time spent in SQL queries by view.", f"# TYPE {name} counter"]
+            for (view, method, status), seconds in sorted(self.sql_seconds.items()):
+                lines.append(f"{name}{{{_labels(view=view, method=method, status=status)}}} {seconds}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.3 on 2026-10-18 00:55
+
+import base.models
+from django.core.management.base import CommandError
+from django.db import migrations, models
+from django.db.models import Count
+
+# Duplicated seats listed in the error, the count of the rest is given
+DUPLICATES_SHOWN = 20
+
+
+def check_double_bookings(apps, schema_editor):
+    # Which booking of a double-booked seat to keep is a refund decision, so report them instead
+    Booking = apps.get_model("base", "Booking")
+    duplicates = list(
+        Booking.objects.values("showtime_id", "seat_id")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+        .order_by("showtime_id", "seat_id")
+    )
+    if not duplicates:
+        return
+    lines = []
+    for duplicate in duplicates[:DUPLICATES_SHOWN]:
+        ids = Booking.objects.filter(
+            showtime_id=duplicate["showtime_id"], seat_id=duplicate["seat_id"]
+        ).order_by("id").values_list("id", flat=True)
+        lines.append(
+            f"  showtime {duplicate['showtime_id']}, seat {duplicate['seat_id']}: bookings {', '.join(map(str, ids))}"
+        )
+    if len(duplicates) > DUPLICATES_SHOWN:
+        lines.append(f"  and {len(duplicates) - DUPLICATES_SHOWN} more")
+    raise CommandError(
+        f"{len(duplicates)} seats are booked more than once for the same showtime. Cancel the extra "
+        "bookings and migrate again:\n" + "\n".join(lines)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='booking',
+            name='ticket_number',
+            field=models.CharField(default=base.models.generate_ticket_number, max_length=10, unique=True),
+        ),
+        migrations.RunPython(check_double_bookings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(fields=('showtime', 'seat'), name='unique_booking_showtime_seat'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.3 on 2026-10-18 00:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('base', '0002_booking_unique_showtime_seat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeatHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('seat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='base.seat')),
+                ('showtime', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='base.showtime')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='seathold',
+            constraint=models.UniqueConstraint(fields=('showtime', 'seat'), name='unique_hold_showtime_seat'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.3 on 2026-10-18 00:59
+
+from django.db import migrations, models
+
+
+def row_letters(num):
+    letters = ""
+    while num:
+        num, remainder = divmod(num - 1, 26)
+        letters = chr(remainder + 97) + letters
+    return letters
+
+
+def populate_labels(apps, schema_editor):
+    Seat = apps.get_model("base", "Seat")
+    seats = list(Seat.objects.only("id", "row", "number"))
+    for seat in seats:
+        seat.label = f"{seat.number} {row_letters(seat.row)}"
+    Seat.objects.bulk_update(seats, ["label"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0003_seathold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seat',
+            name='label',
+            field=models.CharField(default='', editable=False, max_length=16),
+        ),
+        migrations.RunPython(populate_labels, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.3 on 2026-10-18 01:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0004_seat_label'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='movie',
+            name='tmdb_id',
+            field=models.IntegerField(unique=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.3 on 2026-10-18 01:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0005_movie_sync'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', 'showtime'], name='booking_user_showtime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seat',
+            index=models.Index(fields=['cinema', 'row', 'number'], name='seat_cinema_row_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='showtime',
+            index=models.Index(fields=['movie', 'start_time'], name='showtime_movie_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='showtime',
+            index=models.Index(fields=['start_time'], name='showtime_start_idx'),
+        ),
+    ]
@@ -1,21 +1,45 @@
-from collections import deque
+from collections import defaultdict
 from datetime import timedelta
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.db import models, transaction
+from django.db.models.functions import TruncDate
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import timedelta
-from decouple import config
-import json
+from functools import lru_cache
+from itertools import islice
+from .catalogue import bump_catalogue_version
+from .scheduling import CLOSING_HOUR, PLANNERS, first_day_start, plan_cinemas
+from .tmdb import TMDBClient
 import logging
 import requests
 import secrets
+import time
 
 logger = logging.getLogger(__name__)
 
+SEAT_BATCH_SIZE = 1000  # Seats inserted per statement when generating a cinema's layout
+SYNC_BATCH_SIZE = 100  # Movies upserted per transaction when syncing from TMDB
+SHOWTIME_BATCH_SIZE = 1000  # Showtimes inserted per statement when scheduling
+PLANNER_HISTORY_DAYS = 7  # Days of earlier screenings planners carry their rotation on from
+
+@lru_cache(maxsize=None)
 def number_to_alphabet(num):
-    if num < 1 or num > 26:
-        raise ValueError("Number should be between 1 and 26.")
-    return chr(num + 96)
+    """
+    Converts a row number to its letters: 1 -> a, 26 -> z, 27 -> aa, 28 -> ab and so on.
+    """
+    if num < 1:
+        raise ValueError("Number should be 1 or greater.")
+    letters = ""
+    while num:
+        num, remainder = divmod(num - 1, 26)
+        letters = chr(remainder + 97) + letters
+    return letters
+
+def generate_ticket_number():
+    return secrets.token_hex(5)
 
 class Movie(models.Model):
     title = models.CharField(max_length=200)
@@ -24,75 +48,152 @@ class Movie(models.Model):
     overview = models.TextField()
     poster = models.URLField()
     backdrop_path = models.URLField()
-    tmdb_id = models.IntegerField()
+    tmdb_id = models.IntegerField(unique=True)
     release_date = models.DateField()
+    # False once the film drops out of TMDB's now playing list, its showtimes and bookings are kept
+    is_active = models.BooleanField(default=True)
 
     def __str__(self):
         return self.title
 
+    @staticmethod
+    def fields_from_api(movie_data, movie_details):
+        """
+        Maps a now_playing entry and its movie details to Movie field values, or returns None
+        when the film cannot be scheduled because TMDB has no runtime or release date for it.
+        Missing images, overview and rating are left empty.
+        """
+        release_date = parse_date(movie_details.get("release_date") or "")
+        if not movie_details.get("runtime") or release_date is None:
+            return None
+        poster_path = movie_data.get("poster_path")
+        backdrop_path = movie_data.get("backdrop_path")
+        return {
+            "title": movie_details.get("original_title") or movie_data.get("title") or "",
+            "duration": timedelta(minutes=movie_details["runtime"]),
+            "rating": movie_details.get("vote_average") or 0,
+            "poster": "https://image.tmdb.org/t/p/w400" + poster_path if poster_path else "",
+            "backdrop_path": "https://image.tmdb.org/t/p/original" + backdrop_path if backdrop_path else "",
+            "overview": movie_details.get("overview") or "",
+            "tmdb_id": movie_details["id"],
+            "release_date": release_date,
+            "is_active": True,
+        }
+
     @classmethod
-    def update_from_api(cls):
+    def upsert_from_api(cls, entries):
         """
-        Updates the movie data by fetching the latest information from TMDB API and replacing the existing data in the database.
+        Inserts new movies and updates the changed fields of known ones, matching them on tmdb_id.
+        Takes (now_playing entry, movie details) pairs and returns the resulting movies.
         """
-        try:
-            # API endpoint URL
-            url = "https://api.themoviedb.org/3/movie/now_playing?region=us%2Cng"
-            tmdb_key = config("TMDB_KEY")
-            headers = {
-                "accept": "application/json",
-                "Authorization": f"Bearer {tmdb_key}",
-            }
+        # The same film can be listed more than once, the last entry wins
+        fetched = {}
+        for movie_data, movie_details in entries:
+            fields = cls.fields_from_api(movie_data, movie_details)
+            if fields is None:
+                # One incomplete entry must not abort the sync of the others
+                logger.warning(f"Skipped TMDB movie {movie_details['id']}: no runtime or release date.")
+                continue
+            fetched[fields["tmdb_id"]] = fields
+
+        existing = cls.objects.in_bulk(list(fetched), field_name="tmdb_id")
+        to_create, to_update, changed_fields = [], [], set()
+        for tmdb_id, fields in fetched.items():
+            movie = existing.get(tmdb_id)
+            if movie is None:
+                to_create.append(cls(**fields))
+                continue
+            changed = {name for name, value in fields.items() if getattr(movie, name) != value}
+            if changed:
+                for name in changed:
+                    setattr(movie, name, fields[name])
+                to_update.append(movie)
+                changed_fields |= changed
+
+        cls.objects.bulk_create(to_create)
+        if to_update:
+            cls.objects.bulk_update(to_update, sorted(changed_fields))
+        if to_create and any(movie.pk is None for movie in to_create):
+            # Backends that cannot return primary keys from bulk inserts
+            existing = cls.objects.in_bulk(list(fetched), field_name="tmdb_id")
+        else:
+            existing.update((movie.tmdb_id, movie) for movie in to_create)
+
+        # Link the movies to every cinema, adding only the links that are missing
+        movies = [existing[tmdb_id] for tmdb_id in fetched]
+        through = Cinema.movies.through
+        linked = set(
+            through.objects.filter(movie__in=movies).values_list("cinema_id", "movie_id")
+        )
+        through.objects.bulk_create(
+            through(cinema_id=cinema_id, movie_id=movie.pk)
+            for cinema_id in Cinema.objects.values_list("id", flat=True)
+            for movie in movies
+            if (cinema_id, movie.pk) not in linked
+        )
+
+        logger.info(f"Movies synced: {len(to_create)} created, {len(to_update)} updated.")
+        return movies
 
-            # Fetch movie data from the API
-            response = requests.get(url, headers=headers)
-            data = json.loads(response.text)
-
-            # Handle API response errors
-            if "results" not in data:
-                error_message = data["status_message"]
-                raise Exception(f"API error: {error_message}")
-
-            with transaction.atomic():  # ensures that the database operations (deleting existing movies and creating new movies) are executed within a transaction
-                # Delete existing movies from the database
-                cls.objects.all().delete()
-
-                movies = []
-                for movie_data in data["results"]:
-                    # Get the TMDB ID for the movie
-                    tmdb_id = movie_data["id"]
-
-                    # API URL to fetch the details of the movie
-                    movie_details_url = f"https://api.themoviedb.org/3/movie/{tmdb_id}"
-                    response_details = requests.get(movie_details_url, headers=headers)
-                    movie_details = json.loads(response_details.text)
-
-                    # Create new Movie instances with API data
-                    movie = cls(
-                        title=movie_details["original_title"],
-                        duration=timedelta(minutes=movie_details["runtime"]),
-                        rating=movie_details["vote_average"],
-                        poster="https://image.tmdb.org/t/p/w400"
-                        + movie_data["poster_path"],
-                        backdrop_path="https://image.tmdb.org/t/p/original"
-                        + movie_data["backdrop_path"],
-                        overview=movie_details["overview"],
-                        tmdb_id=movie_details["id"],
-                        release_date=movie_details["release_date"],
-                    )
-
-                    logger.info(f'{movie.title} - gotten')
-                    movie.save()  # Save the movie instance to the database
-                    movies.append(movie)
-
-                # Get all cinemas
-                cinemas = Cinema.objects.all()
-
-                # Add all movies to all cinemas
-                for cinema in cinemas:
-                    cinema.movies.add(*movies)
-
-                logger.info("Movies updated successfully.")
+    @classmethod
+    def retire_missing(cls, tmdb_ids):
+        """
+        Retires active movies whose tmdb_id is not in the given IDs, unlinking them from the cinemas
+        so they are no longer scheduled. Existing showtimes and bookings are left untouched.
+        """
+        # Diff in Python so the query does not grow with the size of the catalogue
+        tmdb_ids = set(tmdb_ids)
+        retired_ids = [
+            movie_id
+            for tmdb_id, movie_id in cls.objects.filter(is_active=True).values_list("tmdb_id", "id")
+            if tmdb_id not in tmdb_ids
+        ]
+        for start in range(0, len(retired_ids), SYNC_BATCH_SIZE):
+            chunk = retired_ids[start:start + SYNC_BATCH_SIZE]
+            Cinema.movies.through.objects.filter(movie_id__in=chunk).delete()
+            cls.objects.filter(id__in=chunk).update(is_active=False)
+        logger.info(f"Movies retired: {len(retired_ids)}.")
+        return len(retired_ids)
+
+    @classmethod
+    def update_from_api(cls, client=None):
+        """
+        Updates the movie data by fetching the latest information from TMDB API and syncing it into the database.
+        Pages and movie details are fetched concurrently over the client's pooled session.
+        """
+        owns_client = client is None
+        client = client or TMDBClient()
+        try:
+            # Stream every page of now playing films, fetching their details concurrently,
+            # and upsert them in batches so memory stays flat however many films there are
+            started = time.perf_counter()
+            details = client.iter_movie_details(client.iter_now_playing())
+            synced_ids = set()
+            while True:
+                batch = list(islice(details, SYNC_BATCH_SIZE))
+                if not batch:
+                    break
+                with transaction.atomic():
+                    cls.upsert_from_api(batch)
+                # Skipped films are still now playing, so they are not retired either
+                synced_ids.update(movie_details["id"] for _, movie_details in batch)
+            logger.info(
+                f"Synced {len(synced_ids)} movies in {time.perf_counter() - started:.2f}s "
+                f"({client.max_workers} workers)"
+            )
+
+            # Retire films only after a complete run, never because of an empty or partial response
+            if synced_ids:
+                with transaction.atomic():
+                    cls.retire_missing(synced_ids)
+
+            logger.info("Movies updated successfully.")
+
+            logger.info(
+                f"TMDB requests: {client.stats['network_requests']} over the network, "
+                f"{client.stats['cache_hits']} served from cache, {client.stats['revalidated']} revalidated."
+            )
+            bump_catalogue_version()
         except requests.exceptions.Timeout:
             # Handle timeout errors
             logger.exception("Timeout error occurred.")
@@ -105,6 +206,10 @@ class Movie(models.Model):
             # Handle other exceptions (e.g., API response errors)
             logger.exception("Error occurred:")
 
+        finally:
+            if owns_client:
+                client.close()
+
     @staticmethod
     def update_movies_from_api(modeladmin, request, queryset):
         """
@@ -123,16 +228,65 @@ class Cinema(models.Model):
     seats_per_row = models.IntegerField()
     movies = models.ManyToManyField(Movie, blank=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the layout as loaded so save() only regenerates seats when it changes
+        if "rows" in field_names and "seats_per_row" in field_names:
+            instance._loaded_layout = (instance.rows, instance.seats_per_row)
+        return instance
+
+    def removed_seats(self):
+        """
+        Returns the seats of the cinema that fall outside its current rows and seats per row.
+        """
+        return Seat.objects.filter(cinema=self).filter(
+            models.Q(row__gt=self.rows) | models.Q(number__gt=self.seats_per_row)
+        )
+
+    def check_resize(self):
+        # Deleting a booked seat would cascade to its bookings, past ones included
+        if Booking.objects.filter(seat__in=self.removed_seats()).exists():
+            raise ValidationError(
+                "The cinema cannot be resized, seats outside the new layout have bookings."
+            )
+
+    def clean(self):
+        if self.pk is not None and (self.rows, self.seats_per_row) != getattr(self, "_loaded_layout", None):
+            self.check_resize()
+
     def save(self, *args, **kwargs):
-        is_new = self.pk is None
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            is_new = self.pk is None
+            super().save(*args, **kwargs)
+
+            layout = (self.rows, self.seats_per_row)
+            if is_new or layout != getattr(self, "_loaded_layout", None):
+                self.sync_seats(is_new=is_new)
+                self._loaded_layout = layout
 
-        if is_new:
-            seats = [
-                Seat.objects.create(cinema=self, row=i, number=j)
+    def sync_seats(self, is_new=False):
+        """
+        Brings the cinema's seats in line with its rows and seats per row, inserting missing seats
+        and removing the ones outside the layout in bulk.
+        """
+        seats = Seat.objects.filter(cinema=self)
+        existing = set() if is_new else set(seats.values_list("row", "number"))
+
+        if not is_new:
+            # Forms report this through clean(), this guards the other callers
+            self.check_resize()
+            self.removed_seats().delete()
+
+        Seat.objects.bulk_create(
+            (
+                Seat(cinema=self, row=i, number=j, label=Seat.make_label(i, j))
                 for i in range(1, self.rows + 1)
                 for j in range(1, self.seats_per_row + 1)
-            ]
+                if (i, j) not in existing
+            ),
+            batch_size=SEAT_BATCH_SIZE,
+        )
 
     def __str__(self):
         return self.name
@@ -142,16 +296,31 @@ class Seat(models.Model):
     cinema = models.ForeignKey(Cinema, on_delete=models.CASCADE)
     row = models.IntegerField()
     number = models.IntegerField()
+    # Display label such as "7 c", computed once when the seat is created
+    label = models.CharField(max_length=16, editable=False, default="")
     # is_booked = models.BooleanField(default=False)
 
+    @staticmethod
+    def make_label(row, number):
+        return f'{number} {number_to_alphabet(row)}'
+
     @property
     def seat_number(self):
-        seat_number=f'{self.number} {number_to_alphabet(self.row)}'
-        return seat_number
+        return self.label or self.make_label(self.row, self.number)
+
+    def save(self, *args, **kwargs):
+        self.label = self.make_label(self.row, self.number)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.row},{self.number}"
 
+    class Meta:
+        indexes = [
+            # Seat maps read a cinema's seats in row and number order
+            models.Index(fields=["cinema", "row", "number"], name="seat_cinema_row_number_idx"),
+        ]
+
 
 class Showtime(models.Model):
     cinema = models.ForeignKey(Cinema, on_delete=models.CASCADE)
@@ -164,59 +333,155 @@ class Showtime(models.Model):
         return f"{self.movie} at {self.cinema} - {self.start_time.strftime('%Y-%m-%d %H:%M')}"
 
     @classmethod
-    def create_showtimes(cls, cinema):
+    def create_showtimes(cls, cinema, days=7):
         """
         Schedules showtimes for movies in the given cinema for the next 7 days.
         """
-        # Get all available movies
-        movies = deque(cinema.movies.all())
-
-        # Start scheduling from tomorrow 8am
-        start_time = timezone.now().replace(
-            hour=8, minute=0, second=0, microsecond=0
-        ) + timedelta(days=1)
-
-        # Schedule for the next 7 days
-        for _ in range(7):
-            while movies:
-                movie = movies.popleft()  # Get the next movie from the queue
-
-                # Calculate end time of the movie
-                end_time = start_time + movie.duration
-
-                # If the end time is before 10pm, schedule the movie
-                if end_time.hour < 22:
-                    cls.objects.create(
-                        cinema=cinema,
-                        movie=movie,
-                        start_time=start_time,
-                        end_time=end_time,
-                    )
-
-                    # Schedule the next movie 1 hour after the end of the current movie
-                    start_time = end_time + timedelta(hours=1)
-                else:
-                    # If the movie can't be scheduled today, put it back into the queue
-                    movies.append(movie)
-                    break  # Break the loop and move to the next day
-
-            # Move to the next day 8am
-            start_time = start_time.replace(
-                hour=8, minute=0, second=0, microsecond=0
-            ) + timedelta(days=1)
-
-            # If all movies have been scheduled, start scheduling from the first movie again
-            if not movies:
-                movies = deque(cinema.movies.all())
+        return cls.schedule_cinemas([cinema], days=days)
+
+    @classmethod
+    def schedule_cinemas(cls, cinemas, days=7, workers=None, planner=None, weighting=None, reset=False):
+        """
+        Schedules showtimes for every given cinema over the next days, starting tomorrow 8am.
+        Days a cinema already has showtimes for are kept as they are, so only the missing days
+        beyond the current horizon are planned. All the showtimes are planned in memory,
+        optionally across a process pool, and inserted with bulk_create.
+
+        With reset, the unbooked showtimes of the planned days are replaced by a new plan, built
+        around the booked showtimes that are kept. Earlier showtimes, today's included, stay.
+
+        Planners carry their movie rotation on from the cinema's screenings since
+        PLANNER_HISTORY_DAYS ago, so scheduling one day at a time still goes through every movie.
+
+        The planner is one of scheduling.PLANNERS and weighting is None, "rating" or "occupancy",
+        both defaulting to the SHOWTIME_PLANNER and SHOWTIME_PLANNER_WEIGHTING settings.
+        """
+        planner = planner or getattr(settings, "SHOWTIME_PLANNER", "greedy")
+        if planner not in PLANNERS:
+            raise ValueError(f"Unknown planner {planner!r}, choose from {', '.join(PLANNERS)}.")
+        weighting = weighting or getattr(settings, "SHOWTIME_PLANNER_WEIGHTING", None)
+        cinemas = list(cinemas)
+        weights = cls.planner_weights(cinemas, weighting)
+        start_time = first_day_start(timezone.now())
+        end_time = start_time + timedelta(days=days)
+        upcoming = cls.objects.filter(cinema__in=cinemas, start_time__gte=start_time)
+        # Intervals already taken in every cinema by date, planners fit the new screenings around them
+        busy = defaultdict(lambda: defaultdict(list))
+        if reset:
+            for cinema_id, start, end in (
+                upcoming.filter(start_time__lt=end_time, booking__isnull=False)
+                .values_list("cinema_id", "start_time", "end_time")
+                .distinct()
+            ):
+                busy[cinema_id][start.astimezone(start_time.tzinfo).date()].append((start, end))
+        else:
+            for cinema_id, day in (
+                upcoming.annotate(day=TruncDate("start_time", tzinfo=start_time.tzinfo))
+                .values_list("cinema_id", "day")
+                .distinct()
+            ):
+                # Scheduled days are taken as a whole
+                opening_time = start_time + (day - start_time.date())
+                busy[cinema_id][day].append((opening_time, opening_time.replace(hour=CLOSING_HOUR)))
+
+        earlier = cls.objects.filter(
+            cinema__in=cinemas, start_time__gte=timezone.now() - timedelta(days=PLANNER_HISTORY_DAYS)
+        )
+        if reset:
+            # The showtimes about to be replanned are not part of the rotation
+            earlier = earlier.exclude(pk__in=cls.unbooked(cinemas, start_time, end_time))
+        history = defaultdict(list)
+        for cinema_id, movie_id in earlier.order_by("start_time").values_list("cinema_id", "movie_id"):
+            history[cinema_id].append(movie_id)
+
+        jobs = [
+            (
+                cinema.pk,
+                [(movie.pk, movie.duration) for movie in cinema.movies.all()],
+                start_time,
+                days,
+                dict(busy[cinema.pk]),
+                planner,
+                weights,
+                history[cinema.pk],
+            )
+            for cinema in cinemas
+        ]
+        showtimes = [
+            cls(cinema_id=cinema_id, movie_id=movie_id, start_time=start, end_time=end)
+            for cinema_id, screenings in plan_cinemas(jobs, workers=workers)
+            for movie_id, start, end in screenings
+        ]
+        with transaction.atomic():
+            cleared = cls.clear_unbooked(cinemas, start_time, end_time) if reset else 0
+            showtimes = cls.objects.bulk_create(showtimes, batch_size=SHOWTIME_BATCH_SIZE)
+
+        if showtimes or cleared:
+            bump_catalogue_version()
+        return showtimes
+
+    @classmethod
+    def planner_weights(cls, cinemas, weighting):
+        """
+        Returns the demand weight of each movie by ID, from its rating or from the average number
+        of tickets sold per past showtime.
+        """
+        if weighting is None:
+            return None
+        if weighting == "rating":
+            return {
+                movie.pk: max(movie.rating, 0.1)
+                for cinema in cinemas
+                for movie in cinema.movies.all()
+            }
+        if weighting == "occupancy":
+            past_showtimes = (
+                cls.objects.filter(start_time__lt=timezone.now())
+                .values("movie_id")
+                .annotate(tickets=models.Count("booking"), shows=models.Count("id", distinct=True))
+            )
+            return {
+                row["movie_id"]: 1 + row["tickets"] / row["shows"] for row in past_showtimes
+            }
+        raise ValueError(f"Unknown weighting {weighting!r}, choose rating or occupancy.")
+
+    @classmethod
+    def unbooked(cls, cinemas=None, start_time=None, end_time=None):
+        """
+        Returns the showtimes nobody has booked starting from start_time (now by default) and
+        before end_time.
+        """
+        showtimes = cls.objects.filter(start_time__gte=start_time or timezone.now(), booking__isnull=True)
+        if end_time is not None:
+            showtimes = showtimes.filter(start_time__lt=end_time)
+        if cinemas is not None:
+            showtimes = showtimes.filter(cinema__in=cinemas)
+        return showtimes
+
+    @classmethod
+    def clear_unbooked(cls, cinemas=None, start_time=None, end_time=None):
+        """
+        Deletes the unbooked showtimes between start_time and end_time, so they can be planned again.
+        """
+        showtimes = cls.unbooked(cinemas, start_time, end_time)
+        return cls.objects.filter(pk__in=list(showtimes.values_list("pk", flat=True))).delete()[0]
 
     def booked_seats(self):
         return Seat.objects.filter(booking__showtime=self)
 
+    class Meta:
+        indexes = [
+            # Upcoming showtimes of a movie, for the now-showing listing and movie details
+            models.Index(fields=["movie", "start_time"], name="showtime_movie_start_idx"),
+            # Upcoming or past showtimes across the catalogue, for scheduling and weighting
+            models.Index(fields=["start_time"], name="showtime_start_idx"),
+        ]
+
 
 class Booking(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True)
     ticket_number = models.CharField(
-        max_length=10, default=secrets.token_hex(5), unique=True
+        max_length=10, default=generate_ticket_number, unique=True
     )
     showtime = models.ForeignKey(Showtime, on_delete=models.CASCADE)
     seat = models.ForeignKey(Seat, on_delete=models.CASCADE)
@@ -224,6 +489,59 @@ class Booking(models.Model):
     def __str__(self):
         return f"{self.user} with {self.ticket_number} at {self.showtime} - {self.seat}"
 
+    class Meta:
+        constraints = [
+            # A seat can only be sold once per showtime, whatever the interleaving of concurrent requests
+            models.UniqueConstraint(
+                fields=["showtime", "seat"], name="unique_booking_showtime_seat"
+            ),
+        ]
+        indexes = [
+            # A customer's bookings, joined to their showtimes
+            models.Index(fields=["user", "showtime"], name="booking_user_showtime_idx"),
+        ]
+
+class SeatHold(models.Model):
+    """
+    A short-lived claim on a seat for a showtime, placed while the customer completes payment.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    showtime = models.ForeignKey(Showtime, on_delete=models.CASCADE)
+    seat = models.ForeignKey(Seat, on_delete=models.CASCADE)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.seat} held by {self.user} for {self.showtime} until {self.expires_at}"
+
+    @classmethod
+    def active(cls):
+        return cls.objects.filter(expires_at__gt=timezone.now())
+
+    @classmethod
+    def expired(cls):
+        return cls.objects.filter(expires_at__lte=timezone.now())
+
+    @classmethod
+    def purge_expired(cls, batch_size=5000):
+        """
+        Deletes expired holds in batches of bulk DELETE statements and returns how many were removed.
+        """
+        expired = cls.expired()
+        purged = 0
+        while True:
+            expired_ids = list(expired.values_list("id", flat=True)[:batch_size])
+            if not expired_ids:
+                return purged
+            purged += cls.objects.filter(id__in=expired_ids).delete()[0]
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["showtime", "seat"], name="unique_hold_showtime_seat"
+            ),
+        ]
+
+
 class Payment(models.Model):
     booking = models.OneToOneField(Booking, on_delete=models.SET_NULL, null=True)
     amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
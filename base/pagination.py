@@ -0,0 +1,108 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class StartTimeCursorPagination(CursorPagination):
+    """
+    Keyset pagination on (start_time, id), so every page is a single indexed range scan however
+    deep it is and rows added meanwhile never shift the pages being walked.
+
+    Building the page query and reading its rows are split so async views can fetch the rows
+    with the async ORM through ``apaginate_queryset``.
+    """
+
+    ordering = ("start_time", "id")
+    page_size = getattr(settings, "PAGE_SIZE", 20)
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([obj async for obj in queryset])
+
+    def page_queryset(self, queryset, request, view=None):
+        """
+        Returns the query for the requested page, with one extra row telling whether a next
+        page follows. Same steps as CursorPagination.paginate_queryset.
+        """
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (self.offset, self.reverse, self.current_position) = (0, False, None)
+        else:
+            (self.offset, self.reverse, self.current_position) = self.cursor
+
+        if self.reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if self.current_position is not None:
+            order = self.ordering[0]
+            is_reversed = order.startswith("-")
+            order_attr = order.lstrip("-")
+            if self.cursor.reverse != is_reversed:
+                queryset = queryset.filter(**{order_attr + "__lt": self.current_position})
+            else:
+                queryset = queryset.filter(**{order_attr + "__gt": self.current_position})
+
+        return queryset[self.offset:self.offset + self.page_size + 1]
+
+    def set_page(self, results):
+        """
+        Takes the rows of the page query and works out the page and its neighbouring cursors.
+        """
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if self.reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (self.current_position is not None) or (self.offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = self.current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (self.current_position is not None) or (self.offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = self.current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+
+class MovieCursorPagination(StartTimeCursorPagination):
+    """
+    Keyset pagination of the now showing movies on their id.
+
+    Their next showtime moves later as showtimes start, so a movie paged on it could come back on
+    a later page of the same walk. Ids never change, so every movie is listed exactly once.
+    """
+
+    ordering = ("id",)
@@ -0,0 +1,158 @@
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+# Screenings run between 8am and 10pm with an hour between them for cleaning
+OPENING_HOUR = 8
+CLOSING_HOUR = 22
+CLEANING_GAP = timedelta(hours=1)
+
+
+def first_day_start(now):
+    """
+    Returns 8am on the day after the given time, when scheduling starts.
+    """
+    return now.replace(hour=OPENING_HOUR, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+
+def free_windows(day_start, busy=()):
+    """
+    Returns the (start, end) windows left for screenings on the day opening at day_start, around
+    the (start, end) intervals of the busy screenings and their cleaning gaps.
+    """
+    closing_time = day_start.replace(hour=CLOSING_HOUR)
+    windows = []
+    slot = day_start
+    for start, end in sorted(busy):
+        if start - CLEANING_GAP > slot:
+            windows.append((slot, start - CLEANING_GAP))
+        slot = max(slot, end + CLEANING_GAP)
+    if slot < closing_time:
+        windows.append((slot, closing_time))
+    return windows
+
+
+def plan_screenings(movies, start_time, days, busy=None, weights=None, history=()):
+    """
+    Plans screenings for one cinema, cycling through its movies in order. A window ends as soon as
+    the next movie in the queue does not fit, and weights are not used.
+
+    Takes (movie ID, duration) pairs and returns (movie ID, start time, end time) tuples. busy maps
+    dates to the (start, end) intervals already taken that day, screenings are planned around them.
+    history lists the movie IDs of the cinema's earlier screenings in order, the cycle goes on
+    after the last of them. This only works on plain data, so plans can be computed in other
+    processes.
+    """
+    screenings = []
+    queue = deque(movies)
+    busy = busy or {}
+    movie_ids = [movie_id for movie_id, _ in movies]
+    for movie_id in reversed(history):
+        if movie_id in movie_ids:
+            queue.rotate(-(movie_ids.index(movie_id) + 1))
+            break
+
+    for _ in range(days):
+        day_start = start_time
+        start_time = day_start + timedelta(days=1)
+
+        for slot, closing_time in free_windows(day_start, busy.get(day_start.date(), ())):
+            while queue:
+                movie_id, duration = queue.popleft()  # Get the next movie from the queue
+
+                # Calculate end time of the movie
+                end_time = slot + duration
+
+                # If the movie ends before the window closes, schedule it
+                if end_time < closing_time:
+                    screenings.append((movie_id, slot, end_time))
+
+                    # Schedule the next movie 1 hour after the end of the current movie
+                    slot = end_time + CLEANING_GAP
+                else:
+                    # If the movie can't be scheduled in this window, put it back into the queue
+                    queue.append((movie_id, duration))
+                    break  # Break the loop and move to the next window
+
+        # If all movies have been scheduled, start scheduling from the first movie again
+        if not queue:
+            queue = deque(movies)
+
+    return screenings
+
+
+def pack_screenings(movies, start_time, days, busy=None, weights=None, history=()):
+    """
+    Plans screenings for one cinema by packing each day's opening hours, around the busy intervals.
+
+    Every slot goes to the movie with the best score among those that still fit before closing,
+    the score being its weight (1 by default) divided by how often it has been shown already,
+    the earlier screenings in history included, so demand sets the mix while every movie keeps
+    getting screens. For the last slot of the day the longest movie that fits is picked instead,
+    to leave as little idle time as possible.
+    """
+    screenings = []
+    if not movies:
+        return screenings
+    weights = weights or {}
+    busy = busy or {}
+    shown = Counter(history)
+    shortest = min(duration for _, duration in movies)
+
+    def score(movie):
+        movie_id, duration = movie
+        return weights.get(movie_id, 1) / (1 + shown[movie_id]), duration
+
+    for _ in range(days):
+        day_start = start_time
+        start_time = day_start + timedelta(days=1)
+
+        for slot, closing_time in free_windows(day_start, busy.get(day_start.date(), ())):
+            while True:
+                fitting = [movie for movie in movies if slot + movie[1] < closing_time]
+                if not fitting:
+                    break
+                movie_id, duration = max(fitting, key=score)
+                if slot + duration + CLEANING_GAP + shortest >= closing_time:
+                    # Nothing else fits after this one, so fill the rest of the window as fully as possible
+                    movie_id, duration = max(fitting, key=lambda movie: (movie[1], score(movie)))
+
+                end_time = slot + duration
+                screenings.append((movie_id, slot, end_time))
+                shown[movie_id] += 1
+                slot = end_time + CLEANING_GAP
+
+    return screenings
+
+
+# Scheduling engines by name, each taking (movies, start time, days, busy intervals by date, weights,
+# earlier screenings)
+PLANNERS = {
+    "greedy": plan_screenings,
+    "packing": pack_screenings,
+}
+
+
+def utilization(screenings, days):
+    """
+    Returns the share of a cinema's opening hours over the given days spent screening movies.
+    """
+    opening_hours = timedelta(hours=CLOSING_HOUR - OPENING_HOUR) * days
+    return sum((end - start for _, start, end in screenings), timedelta()) / opening_hours
+
+
+def _plan_cinema(job):
+    cinema_id, movies, start_time, days, busy, planner, weights, history = job
+    return cinema_id, PLANNERS[planner](movies, start_time, days, busy, weights, history)
+
+
+def plan_cinemas(jobs, workers=None):
+    """
+    Plans screenings for several cinemas from (cinema ID, movies, start time, days, busy intervals
+    by date, planner name, weights, earlier screenings) jobs and returns (cinema ID, screenings) pairs. With more than
+    one worker the cinemas are fanned out across a process pool.
+    """
+    if workers and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_plan_cinema, jobs, chunksize=8))
+    return [_plan_cinema(job) for job in jobs]
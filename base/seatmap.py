@@ -0,0 +1,175 @@
+from django.conf import settings
+from django.core.cache import cache
+from .models import Booking, Seat, SeatHold
+import time
+
+SEAT_MAP_CACHE_TIMEOUT = getattr(settings, "SEAT_MAP_CACHE_TIMEOUT", 300)
+# Seat columns loaded for a seat map, its seats are plain rows rather than model instances
+SEAT_COLUMNS = ("id", "label", "row", "number")
+
+
+class SeatBitmap:
+    """
+    Compact availability bitset for a cinema hall, one bit per seat.
+
+    Seats are indexed by row and number as laid out by ``Cinema.rows`` x ``Cinema.seats_per_row``.
+    """
+
+    def __init__(self, rows, seats_per_row, data=None):
+        self.rows = rows
+        self.seats_per_row = seats_per_row
+        size = (rows * seats_per_row + 7) // 8
+        self.data = bytearray(data) if data is not None else bytearray(size)
+
+    def _index(self, row, number):
+        if not (1 <= row <= self.rows and 1 <= number <= self.seats_per_row):
+            return None
+        return (row - 1) * self.seats_per_row + (number - 1)
+
+    def is_set(self, row, number):
+        index = self._index(row, number)
+        if index is None:
+            return False
+        return bool(self.data[index // 8] & (1 << (index % 8)))
+
+    def set(self, row, number):
+        index = self._index(row, number)
+        if index is not None:
+            self.data[index // 8] |= 1 << (index % 8)
+
+    def clear(self, row, number):
+        index = self._index(row, number)
+        if index is not None:
+            self.data[index // 8] &= ~(1 << (index % 8)) & 0xFF
+
+
+def _version_key(showtime):
+    return f"seatmap:{showtime.pk}:version"
+
+
+def _cache_key(showtime, version):
+    # The hall dimensions are part of the key so resizing a cinema never serves a stale layout
+    cinema = showtime.cinema
+    return f"seatmap:{showtime.pk}:{version}:{cinema.rows}x{cinema.seats_per_row}"
+
+
+def _get_version(showtime):
+    key = _version_key(showtime)
+    version = cache.get(key)
+    if version is None:
+        # Counters start from the clock so one recreated after an eviction never meets old bitmaps
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+async def _aget_version(showtime):
+    key = _version_key(showtime)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key)
+    return version
+
+
+def layout_queryset(showtime):
+    return Seat.objects.filter(cinema_id=showtime.cinema_id).order_by("row", "number").values(*SEAT_COLUMNS)
+
+
+def bookings_queryset(showtime):
+    return Booking.objects.filter(showtime=showtime).values_list("seat__row", "seat__number")
+
+
+def holds_queryset(showtime):
+    return SeatHold.active().filter(showtime=showtime).values_list("seat_id", flat=True)
+
+
+def get_booked_bitmap(showtime):
+    """
+    Returns the booked-seat bitmap for the showtime, building and caching it on a miss.
+
+    Bitmaps are cached under the showtime's version as read before querying the bookings, so a
+    bitmap built while a booking commits lands on a key its version bump has already retired.
+    """
+    cinema = showtime.cinema
+    key = _cache_key(showtime, _get_version(showtime))
+    data = cache.get(key)
+    if data is not None:
+        return SeatBitmap(cinema.rows, cinema.seats_per_row, data)
+
+    bitmap = SeatBitmap(cinema.rows, cinema.seats_per_row)
+    for row, number in bookings_queryset(showtime):
+        bitmap.set(row, number)
+    cache.set(key, bytes(bitmap.data), SEAT_MAP_CACHE_TIMEOUT)
+    return bitmap
+
+
+async def aget_booked_bitmap(showtime):
+    """
+    Async version of get_booked_bitmap().
+    """
+    cinema = showtime.cinema
+    key = _cache_key(showtime, await _aget_version(showtime))
+    data = await cache.aget(key)
+    if data is not None:
+        return SeatBitmap(cinema.rows, cinema.seats_per_row, data)
+
+    bitmap = SeatBitmap(cinema.rows, cinema.seats_per_row)
+    async for row, number in bookings_queryset(showtime):
+        bitmap.set(row, number)
+    await cache.aset(key, bytes(bitmap.data), SEAT_MAP_CACHE_TIMEOUT)
+    return bitmap
+
+
+def invalidate_booked_bitmap(showtime):
+    """
+    Retires the cached bitmap of the showtime once its bookings changed by bumping its version,
+    the next read rebuilds it.
+
+    The bump is atomic, so concurrent bookings never undo each other's invalidation and stale
+    rebuilds are never served. Every worker has to share the cache for them to see it.
+    """
+    key = _version_key(showtime)
+    cache.add(key, time.time_ns(), None)
+    cache.incr(key)
+
+
+class SeatMap:
+    """
+    Seat availability for a single showtime.
+
+    The hall layout and the active seat holds are loaded with one query each and bookings
+    come from the cached bitmap, so building the map costs the same number of queries however
+    big the cinema is and steady-state reads never touch the Booking table. Seats are kept as
+    ``.values()`` rows of SEAT_COLUMNS, ready for the fast seat serializer.
+    """
+
+    def __init__(self, showtime, seats, booked, held_seat_ids=frozenset()):
+        self.showtime = showtime
+        self.seats = seats
+        self.booked = booked
+        self.held_seat_ids = held_seat_ids
+
+    @classmethod
+    def for_showtime(cls, showtime):
+        """
+        Builds the seat map for the given showtime.
+        """
+        seats = list(layout_queryset(showtime))
+        held_seat_ids = set(holds_queryset(showtime))
+        return cls(showtime, seats, get_booked_bitmap(showtime), held_seat_ids)
+
+    @classmethod
+    async def afor_showtime(cls, showtime):
+        """
+        Builds the seat map for the given showtime with the async ORM.
+        """
+        seats = [seat async for seat in layout_queryset(showtime)]
+        held_seat_ids = {seat_id async for seat_id in holds_queryset(showtime)}
+        return cls(showtime, seats, await aget_booked_bitmap(showtime), held_seat_ids)
+
+    def is_booked(self, row, number):
+        return self.booked.is_set(row, number)
+
+    def is_held(self, seat_id):
+        return seat_id in self.held_seat_ids
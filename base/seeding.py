@@ -0,0 +1,76 @@
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from .models import Booking, Cinema, Movie, Seat, Showtime, generate_ticket_number
+import random
+
+
+def seed_catalogue(cinemas=5, rows=10, seats_per_row=20, movies=20, days=7, users=50, bookings=1000, seed=0):
+    """
+    Fills the database with synthetic cinemas, movies, showtimes, users and bookings for
+    benchmarks and query plan checks. Returns the created objects by kind.
+    """
+    rng = random.Random(seed)
+    tag = rng.randrange(10**6)
+    now = timezone.now()
+    with transaction.atomic():
+        created_movies = Movie.objects.bulk_create(
+            Movie(
+                title=f"Seeded Movie {i}",
+                duration=timedelta(minutes=rng.randint(80, 180)),
+                rating=round(rng.uniform(4, 9), 1),
+                overview="",
+                poster="http://example.com/poster.jpg",
+                backdrop_path="http://example.com/backdrop.jpg",
+                tmdb_id=-(tag * 10**4 + i + 1),  # negative IDs never clash with TMDB's
+                release_date=now.date(),
+            )
+            for i in range(movies)
+        )
+        created_cinemas = [
+            Cinema.objects.create(name=f"Seeded Cinema {i}", rows=rows, seats_per_row=seats_per_row)
+            for i in range(cinemas)
+        ]
+        through = Cinema.movies.through
+        through.objects.bulk_create(
+            through(cinema_id=cinema.pk, movie_id=movie.pk)
+            for cinema in created_cinemas
+            for movie in created_movies
+        )
+        showtimes = Showtime.schedule_cinemas(
+            Cinema.objects.filter(pk__in=[cinema.pk for cinema in created_cinemas]).prefetch_related("movies"),
+            days=days,
+        )
+        created_users = User.objects.bulk_create(
+            User(username=f"seeded-{tag}-{i}") for i in range(users)
+        )
+
+        seats = {}
+        for seat_id, cinema_id in Seat.objects.filter(cinema__in=created_cinemas).values_list("id", "cinema_id"):
+            seats.setdefault(cinema_id, []).append(seat_id)
+        booked = set()
+        capacity = len(showtimes) * rows * seats_per_row
+        while showtimes and len(booked) < min(bookings, capacity):
+            showtime = rng.choice(showtimes)
+            booked.add((showtime.pk, rng.choice(seats[showtime.cinema_id]), showtime.cinema_id))
+        created_bookings = Booking.objects.bulk_create(
+            (
+                Booking(
+                    user=rng.choice(created_users),
+                    showtime_id=showtime_id,
+                    seat_id=seat_id,
+                    ticket_number=generate_ticket_number(),
+                )
+                for showtime_id, seat_id, _ in booked
+            ),
+            batch_size=500,
+        )
+
+    return {
+        "movies": created_movies,
+        "cinemas": created_cinemas,
+        "showtimes": showtimes,
+        "users": created_users,
+        "bookings": created_bookings,
+    }
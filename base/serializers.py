@@ -1,17 +1,26 @@
 from rest_framework import serializers, generics
 from django.contrib.auth.models import User
-from django.db import transaction
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.utils import timezone
-from .models import Movie, Showtime, Seat, Booking, Cinema, Payment
-import secrets
+from datetime import timedelta
+from .models import Movie, Showtime, Seat, SeatHold, Booking, Cinema, Payment, generate_ticket_number
+from .events import BOOKED, HELD, publish
+from .fast_serializers import ValuesSerializer
+from .seatmap import SeatMap, invalidate_booked_bitmap
+
+SEAT_HOLD_TTL = getattr(settings, "SEAT_HOLD_TTL", 300)
+SEAT_HOLD_LIMIT = getattr(settings, "SEAT_HOLD_LIMIT", 10)
+MOVIE_SHOWTIMES_LIMIT = getattr(settings, "MOVIE_SHOWTIMES_LIMIT", 20)
 
 
 class MovieListSerializer(serializers.ModelSerializer):
     """
     Serializer for the Movie model. It includes fields for the next showtime and its ID.
+    The next showtime is expected as an annotation on the queryset (see MovieListView).
     """
     rating=serializers.DecimalField(decimal_places=1, max_digits=3)
-    next_showtime = serializers.SerializerMethodField()
+    next_showtime = serializers.DateTimeField(read_only=True)
 
     class Meta:
         model = Movie
@@ -25,23 +34,9 @@ class MovieListSerializer(serializers.ModelSerializer):
             "next_showtime",
         ]
 
-    def get_next_showtime(self, obj):
-        """
-        Method to get the next showtime for the movie.
-        """
-        try:
-            next_showtime = (
-                Showtime.objects.filter(movie=obj, start_time__gt=timezone.now())
-                .order_by("start_time")
-                .first()
-            )
-            if next_showtime:
-                return next_showtime.start_time
-            else:
-                return None
-        except Exception as e:
-            print(e)
-            return None 
+
+# Fast path of MovieListSerializer for .values() rows
+movie_list_values_serializer = ValuesSerializer(MovieListSerializer)
 
 
 class ShowtimeSerializer(serializers.ModelSerializer):
@@ -70,18 +65,26 @@ class MovieDetailSerializer(serializers.ModelSerializer):
             "showtimes",
         ]
 
+    @staticmethod
+    def upcoming_showtimes(movie):
+        return Showtime.objects.filter(
+            movie=movie, start_time__gt=timezone.now()
+        ).order_by("start_time", "id")[:MOVIE_SHOWTIMES_LIMIT]
+
     def get_showtimes(self, obj):
         """
-        Method to get showtimes for the movie.
+        Method to get the next showtimes for the movie, the full list is paged by MovieShowtimeListView.
         """
-        showtime = Showtime.objects.filter(
-            movie=obj, start_time__gt=timezone.now()
-        ).order_by("start_time")
+        # Async views fetch the showtimes themselves and pass them in the context
+        showtime = self.context.get("showtimes")
+        if showtime is None:
+            showtime = self.upcoming_showtimes(obj)
         return ShowtimeSerializer(showtime, many=True, context=self.context).data
 
 
 class SeatSerializer(serializers.ModelSerializer):
     is_booked = serializers.SerializerMethodField()
+    is_held = serializers.SerializerMethodField()
 
     class Meta:
         model = Seat
@@ -89,14 +92,32 @@ class SeatSerializer(serializers.ModelSerializer):
             "id",
             "seat_number",
             "is_booked",
+            "is_held",
         ]
 
     def get_is_booked(self, obj):
         """
         Method to check if a seat is booked for a particular showtime.
         """
-        showtime = self.context["view"].get_object()
-        return showtime.booked_seats().filter(id=obj.id).exists()
+        return self.context["seat_map"].is_booked(obj.row, obj.number)
+
+    def get_is_held(self, obj):
+        """
+        Method to check if a seat is temporarily held for a particular showtime.
+        """
+        return self.context["seat_map"].is_held(obj.id)
+
+
+# Fast path of SeatSerializer for the seat rows of a SeatMap, passed as the context
+seat_values_serializer = ValuesSerializer(
+    SeatSerializer,
+    computed={
+        "seat_number": lambda row, seat_map: row["label"] or Seat.make_label(row["row"], row["number"]),
+        "is_booked": lambda row, seat_map: seat_map.is_booked(row["row"], row["number"]),
+        "is_held": lambda row, seat_map: seat_map.is_held(row["id"]),
+    },
+    extra_columns=["label", "row", "number"],
+)
 
 
 class CinemaSerializer(serializers.ModelSerializer):
@@ -136,56 +157,107 @@ class ShowtimeDetailSerializer(serializers.ModelSerializer):
 
     def get_seats(self, obj):
         """
-        Method to get all seats for a cinema.
+        Method to get all seats for a cinema, with their availability for the showtime.
         """
-        seats = Seat.objects.filter(cinema=obj.cinema)
-        return SeatSerializer(seats, many=True, context=self.context).data
+        # Async views build the seat map themselves and pass it in the context
+        seat_map = self.context.get("seat_map") or SeatMap.for_showtime(obj)
+        return seat_values_serializer.many(seat_map.seats, seat_map)
 
     def update(self, instance, validated_data):
         """
         Method to handle the booking of seats.
         """
-        book_seat_ids = validated_data.pop("book_seat", [])
+        # Drop repeated IDs so a seat is never booked twice within the same request
+        book_seat_ids = list(dict.fromkeys(validated_data.pop("book_seat", [])))
         user = self.context.get("user")
-        ticket_numbers = [] # Store Ticket number to be returned
-        bookings_to_create = []  # Store Booking objects to be created
         validation_errors = []  # Store validation errors to be raised
+
+        # Validate every requested seat with a single query scoped to the showtime's cinema
+        seats = Seat.objects.filter(cinema_id=instance.cinema_id).in_bulk(book_seat_ids)
         for book_seat_id in book_seat_ids:
-            try:
-                seat = Seat.objects.get(id=book_seat_id)
-                if Booking.objects.filter(showtime=instance, seat=seat).exists():
-                    validation_errors.append(
-                        f"The seat with ID {book_seat_id} is already booked for this showtime."
-                    )
-                else:
-                    bookings_to_create.append(seat)  # Add to the seat list for later booking
-            except Seat.DoesNotExist:
+            if book_seat_id not in seats:
                 validation_errors.append(
                     f"The seat with ID {book_seat_id} does not exist."
                 )
         if validation_errors:
             raise serializers.ValidationError(validation_errors)
-        
-        # If no validation errors, create the bookings
-        for seat in bookings_to_create:
-            booking = Booking.objects.create(
-                user=user,
-                showtime=instance,
-                seat=seat,
-                ticket_number=secrets.token_hex(5),
-            )
-            ticket_numbers.append(booking.ticket_number) # Add to the ticket list for booking(s) made
+        bookings_to_create = [seats[book_seat_id] for book_seat_id in book_seat_ids]
+
+        # Seats someone else is holding while they pay cannot be booked until the hold lapses
+        held_by_others = (
+            SeatHold.active()
+            .filter(showtime=instance, seat_id__in=book_seat_ids)
+            .exclude(user=user)
+            .values_list("seat_id", flat=True)
+        )
+        validation_errors = [
+            f"The seat with ID {seat_id} is held by another customer." for seat_id in held_by_others
+        ]
+        if validation_errors:
+            raise serializers.ValidationError(validation_errors)
+
+        # Create all the bookings in one transaction. Seats already taken are detected by the
+        # unique (showtime, seat) constraint, which also holds under concurrent requests.
+        try:
+            with transaction.atomic():
+                bookings = Booking.objects.bulk_create(
+                    Booking(
+                        user=user,
+                        showtime=instance,
+                        seat=seat,
+                        ticket_number=generate_ticket_number(),
+                    )
+                    for seat in bookings_to_create
+                )
+                if any(booking.pk is None for booking in bookings):
+                    # Backends that cannot return primary keys from bulk inserts
+                    bookings = list(
+                        Booking.objects.filter(
+                            ticket_number__in=[booking.ticket_number for booking in bookings]
+                        )
+                    )
+
+                # Create Payment objects and associate them with the bookings
+                Payment.objects.bulk_create(
+                    Payment(booking=booking, amount=instance.price, paid=False)
+                    for booking in bookings
+                )
 
-            # Create Payment object and associate it with the booking
-            payment = Payment.objects.create(
-                booking=booking,
-                amount=booking.showtime.price,
-                paid=False,
+                # The customer's holds on these seats have served their purpose
+                SeatHold.objects.filter(
+                    showtime=instance, seat_id__in=book_seat_ids, user=user
+                ).delete()
+        except IntegrityError:
+            raise serializers.ValidationError(
+                self._conflict_errors(instance, bookings_to_create)
             )
 
-        instance.ticket_numbers = ticket_numbers
+        def booked():
+            invalidate_booked_bitmap(instance)
+            publish(instance.pk, BOOKED, [seat.id for seat in bookings_to_create])
+
+        transaction.on_commit(booked)
+
+        # Return the ticket numbers of the booking(s) made
+        instance.ticket_numbers = [booking.ticket_number for booking in bookings]
         return instance
 
+    def _conflict_errors(self, instance, seats):
+        """
+        Method to describe which of the requested seats were taken by another booking.
+        """
+        booked_seat_ids = set(
+            Booking.objects.filter(showtime=instance, seat__in=seats).values_list(
+                "seat_id", flat=True
+            )
+        )
+        errors = [
+            f"The seat with ID {seat.id} is already booked for this showtime."
+            for seat in seats
+            if seat.id in booked_seat_ids
+        ]
+        return errors or ["The booking could not be completed, please try again."]
+
     def to_representation(self, instance):
         """
         Method to include the booking IDs in the serialized output.
@@ -195,6 +267,102 @@ class ShowtimeDetailSerializer(serializers.ModelSerializer):
         return representation
 
 
+class SeatHoldSerializer(serializers.Serializer):
+    """
+    Serializer to place or extend temporary holds on seats of a showtime.
+    """
+
+    seats = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    expires_at = serializers.DateTimeField(read_only=True)
+
+    def create(self, validated_data):
+        """
+        Method to hold the requested seats for the user, extending holds they already own.
+        """
+        showtime = self.context["showtime"]
+        user = self.context["user"]
+        seat_ids = list(dict.fromkeys(validated_data["seats"]))
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=SEAT_HOLD_TTL)
+
+        seats = Seat.objects.filter(cinema_id=showtime.cinema_id).in_bulk(seat_ids)
+        validation_errors = [
+            f"The seat with ID {seat_id} does not exist."
+            for seat_id in seat_ids
+            if seat_id not in seats
+        ]
+        if validation_errors:
+            raise serializers.ValidationError(validation_errors)
+
+        try:
+            with transaction.atomic():
+                # Expired holds on the requested seats can be taken over straight away
+                SeatHold.objects.filter(
+                    showtime=showtime, seat_id__in=seat_ids, expires_at__lte=now
+                ).delete()
+
+                booked = set(
+                    Booking.objects.filter(showtime=showtime, seat_id__in=seat_ids).values_list(
+                        "seat_id", flat=True
+                    )
+                )
+                holders = dict(
+                    SeatHold.objects.filter(showtime=showtime, seat_id__in=seat_ids).values_list(
+                        "seat_id", "user_id"
+                    )
+                )
+                for seat_id in seat_ids:
+                    if seat_id in booked:
+                        validation_errors.append(
+                            f"The seat with ID {seat_id} is already booked for this showtime."
+                        )
+                    elif holders.get(seat_id, user.id) != user.id:
+                        validation_errors.append(
+                            f"The seat with ID {seat_id} is held by another customer."
+                        )
+                if validation_errors:
+                    raise serializers.ValidationError(validation_errors)
+
+                held_elsewhere = (
+                    SeatHold.active()
+                    .filter(showtime=showtime, user=user)
+                    .exclude(seat_id__in=seat_ids)
+                    .count()
+                )
+                if held_elsewhere + len(seat_ids) > SEAT_HOLD_LIMIT:
+                    raise serializers.ValidationError(
+                        [f"No more than {SEAT_HOLD_LIMIT} seats can be held for a showtime."]
+                    )
+
+                SeatHold.objects.filter(
+                    showtime=showtime, seat_id__in=list(holders), user=user
+                ).update(expires_at=expires_at)
+                SeatHold.objects.bulk_create(
+                    SeatHold(user=user, showtime=showtime, seat=seats[seat_id], expires_at=expires_at)
+                    for seat_id in seat_ids
+                    if seat_id not in holders
+                )
+        except IntegrityError:
+            raise serializers.ValidationError(
+                ["One or more of the seats were just held by another customer, please try again."]
+            )
+
+        transaction.on_commit(
+            lambda: publish(
+                showtime.pk, HELD, seat_ids, expires_at=serializers.DateTimeField().to_representation(expires_at)
+            )
+        )
+        return {"seats": seat_ids, "expires_at": expires_at}
+
+
+class SeatReleaseSerializer(serializers.Serializer):
+    """
+    Serializer for the seats whose holds to release, all of the user's holds when left out.
+    """
+
+    seats = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+
 class SeatBookSerializer(serializers.ModelSerializer):
     class Meta:
         model = Seat
@@ -222,6 +390,18 @@ class BookingSerializer(serializers.ModelSerializer):
         fields = ["id", "showtime", "seat", "ticket_number"]
 
 
+# Fast path of BookingSerializer for .values() rows
+booking_values_serializer = ValuesSerializer(
+    BookingSerializer,
+    computed={
+        "seat__seat_number": lambda row, context: (
+            row["seat__label"] or Seat.make_label(row["seat__row"], row["seat__number"])
+        ),
+    },
+    extra_columns=["seat__label", "seat__row", "seat__number"],
+)
+
+
 # class UserSerializer(serializers.ModelSerializer):
 #     first_name = serializers.CharField(required=True)
 #     last_name = serializers.CharField(required=True)
@@ -1,16 +1,279 @@
+from asgiref.sync import async_to_sync, sync_to_async
+from collections import Counter
 from django.contrib.auth.models import User
+from django.core import signals
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from datetime import timedelta
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from dj_rest_auth.models import TokenModel
-from .models import Movie, Showtime, Seat, Booking, Cinema
+from .asgi import DisconnectMiddleware
+from .catalogue import bump_catalogue_version
+from .checks import check_shared_cache
+from .events import BOOKED, publish
+from .management.commands.explain_queries import full_scans
+from .metrics import registry
+from .models import Movie, Showtime, Seat, SeatHold, Booking, Cinema, Payment, number_to_alphabet
+from . import seatmap
+from .seatmap import SeatMap
+from .scheduling import PLANNERS, first_day_start, plan_cinemas, utilization
+from .seeding import seed_catalogue
+from .serializers import (
+    BookingSerializer,
+    MovieListSerializer,
+    SeatSerializer,
+    booking_values_serializer,
+    movie_list_values_serializer,
+    seat_values_serializer,
+)
+from .views import now_showing_movies
+from .tmdb import ResponseCache, TMDBClient
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from rest_framework.renderers import JSONRenderer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+import asyncio
+import hashlib
 import json
+import tempfile
+import threading
+import time
+
+
+class StubTMDBHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.peak_in_flight = max(server.peak_in_flight, server.in_flight)
+        try:
+            time.sleep(server.delay)
+            url = urlparse(self.path)
+            path = url.path
+            if path == "/movie/now_playing":
+                page = int(parse_qs(url.query).get("page", ["1"])[0])
+                page_ids = server.tmdb_ids[(page - 1) * server.page_size:page * server.page_size]
+                payload = {
+                    "page": page,
+                    "total_pages": max(1, -(-len(server.tmdb_ids) // server.page_size)),
+                    "results": [
+                        {
+                            "id": tmdb_id,
+                            "poster_path": f"/{tmdb_id}.jpg",
+                            "backdrop_path": f"/{tmdb_id}-bg.jpg",
+                            **server.overrides.get(tmdb_id, {}),
+                        }
+                        for tmdb_id in page_ids
+                    ],
+                }
+            else:
+                tmdb_id = int(path.rsplit("/", 1)[-1])
+                with server.lock:
+                    fail = tmdb_id in server.fail_once
+                    server.fail_once.discard(tmdb_id)
+                if fail:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                payload = {
+                    "id": tmdb_id,
+                    "original_title": server.titles.get(tmdb_id, f"Movie {tmdb_id}"),
+                    "runtime": 90 + tmdb_id,
+                    "vote_average": 7.5,
+                    "overview": "",
+                    "release_date": "2023-08-01",
+                    **server.overrides.get(tmdb_id, {}),
+                }
+            body = json.dumps(payload).encode()
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+class StubTMDBServer:
+    """
+    Local stand-in for the TMDB API serving now_playing and movie details for the given IDs.
+    """
+
+    def __init__(self, tmdb_ids, delay=0, fail_once=(), page_size=20):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubTMDBHandler)
+        self.server.tmdb_ids = list(tmdb_ids)
+        self.server.page_size = page_size
+        self.server.delay = delay
+        self.server.fail_once = set(fail_once)
+        self.server.titles = {}
+        # Fields served instead of the generated ones, by TMDB ID
+        self.server.overrides = {}
+        self.server.lock = threading.Lock()
+        self.server.requests = self.server.in_flight = self.server.peak_in_flight = 0
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@override_settings(TMDB_CACHE_DIR="")
+class TMDBSyncTestCase(TestCase):
+    def test_update_from_api(self):
+        cinema = Cinema.objects.create(name="Test Cinema", rows=1, seats_per_row=1)
+        stub = StubTMDBServer(range(1, 6), fail_once={3})
+        with stub as server, TMDBClient(api_url=stub.url, api_key="test") as client:
+            Movie.update_from_api(client=client)
+        self.assertEqual(
+            sorted(Movie.objects.values_list("tmdb_id", flat=True)), [1, 2, 3, 4, 5]
+        )
+        self.assertEqual(Movie.objects.get(tmdb_id=3).duration, timedelta(minutes=93))
+        self.assertEqual(cinema.movies.count(), 5)
+
+    def test_sync_updates_incrementally(self):
+        cinema = Cinema.objects.create(name="Test Cinema", rows=1, seats_per_row=1)
+        stub = StubTMDBServer([1, 2, 3])
+        with stub as server, TMDBClient(api_url=stub.url, api_key="test") as client:
+            Movie.update_from_api(client=client)
+            retired = Movie.objects.get(tmdb_id=1)
+            kept = Movie.objects.get(tmdb_id=2)
+            showtime = Showtime.objects.create(
+                cinema=cinema,
+                movie=retired,
+                start_time=timezone.now() + timedelta(days=1),
+                end_time=timezone.now() + timedelta(days=1, hours=2),
+            )
+            booking = Booking.objects.create(showtime=showtime, seat=cinema.seat_set.get())
+
+            server.tmdb_ids = [2, 3, 4]
+            server.titles[3] = "Renamed"
+            with CaptureQueriesContext(connection) as queries:
+                Movie.update_from_api(client=client)
+
+        self.assertFalse(Movie.objects.get(pk=retired.pk).is_active)
+        self.assertTrue(Booking.objects.filter(pk=booking.pk).exists())
+        self.assertEqual(Movie.objects.get(pk=kept.pk).title, "Movie 2")
+        self.assertEqual(Movie.objects.get(tmdb_id=3).title, "Renamed")
+        self.assertEqual(
+            sorted(cinema.movies.values_list("tmdb_id", flat=True)), [2, 3, 4]
+        )
+        updates = [q["sql"] for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 2)  # the renamed film and the retirement
+        self.assertFalse(any(q["sql"].startswith("DELETE FROM \"base_movie\"") for q in queries))
+
+    def test_warm_cache_sync_makes_no_network_requests(self):
+        stub = StubTMDBServer(range(1, 6))
+        with stub as server, tempfile.TemporaryDirectory() as cache_dir:
+            with TMDBClient(api_url=stub.url, api_key="test", cache=ResponseCache(cache_dir)) as client:
+                Movie.update_from_api(client=client)
+            self.assertEqual(server.requests, 6)
+
+            with TMDBClient(api_url=stub.url, api_key="test", cache=ResponseCache(cache_dir)) as client:
+                Movie.update_from_api(client=client)
+            self.assertEqual(server.requests, 6)
+            self.assertEqual(client.stats["cache_hits"], 6)
+
+            # Stale entries are revalidated with their ETag instead of being downloaded again
+            with override_settings(TMDB_CACHE_TTLS={}):
+                with TMDBClient(api_url=stub.url, api_key="test", cache=ResponseCache(cache_dir)) as client:
+                    Movie.update_from_api(client=client)
+            self.assertEqual(client.stats["revalidated"], 6)
+        self.assertEqual(Movie.objects.count(), 5)
+
+    def test_response_cache_evicts_least_recently_used(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = ResponseCache(cache_dir, max_bytes=1000)
+            for i in range(20):
+                cache.set(f"/movie/{i}", {"overview": "x" * 100})
+            self.assertLessEqual(
+                sum(path.stat().st_size for path in Path(cache_dir).glob("*.json")), 1000
+            )
+            self.assertIsNone(cache.get("/movie/0"))
+            self.assertIsNotNone(cache.get("/movie/19"))
+
+    def test_sync_walks_every_page(self):
+        stub = StubTMDBServer(list(range(1, 46)) + [7], page_size=10)
+        with stub as server, TMDBClient(api_url=stub.url, api_key="test") as client:
+            with mock.patch("base.models.SYNC_BATCH_SIZE", 20):
+                Movie.update_from_api(client=client)
+        self.assertEqual(Movie.objects.count(), 45)
+        self.assertEqual(server.requests, 5 + 45)  # every page and each film's details once
+
+    def test_interrupted_sync_does_not_retire_movies(self):
+        stub = StubTMDBServer(range(1, 4))
+        with stub as server, TMDBClient(api_url=stub.url, api_key="test", retries=0) as client:
+            Movie.update_from_api(client=client)
+            server.tmdb_ids = list(range(2, 31))
+            server.page_size = 10
+            server.fail_once = {25}
+            with mock.patch("base.models.SYNC_BATCH_SIZE", 10):
+                Movie.update_from_api(client=client)
+        self.assertTrue(Movie.objects.get(tmdb_id=1).is_active)
+        self.assertTrue(Movie.objects.filter(tmdb_id=12).exists())  # earlier batches are kept
+
+    def test_incomplete_entries_do_not_abort_the_sync(self):
+        stub = StubTMDBServer(range(1, 6))
+        with stub as server, TMDBClient(api_url=stub.url, api_key="test") as client:
+            Movie.update_from_api(client=client)
+            server.tmdb_ids = [2, 3, 4, 5]
+            server.overrides = {
+                2: {"poster_path": None, "backdrop_path": None, "overview": None, "vote_average": None},
+                3: {"runtime": None},
+                4: {"release_date": ""},
+            }
+            Movie.update_from_api(client=client)
+
+        movie = Movie.objects.get(tmdb_id=2)
+        self.assertEqual((movie.poster, movie.backdrop_path, movie.overview, movie.rating), ("", "", "", 0))
+        # Films TMDB cannot give a runtime or release date for are skipped but not retired
+        self.assertEqual(Movie.objects.get(tmdb_id=3).duration, timedelta(minutes=93))
+        self.assertTrue(Movie.objects.get(tmdb_id=4).is_active)
+        # The run went on to retirement
+        self.assertFalse(Movie.objects.get(tmdb_id=1).is_active)
+
+    def test_details_are_fetched_concurrently(self):
+        stub = StubTMDBServer(range(1, 9), delay=0.1)
+        with stub as server, TMDBClient(api_url=stub.url, api_key="test", max_workers=8) as client:
+            started = time.perf_counter()
+            details = client.movies_details(range(1, 9))
+            elapsed = time.perf_counter() - started
+        self.assertEqual([movie["id"] for movie in details], list(range(1, 9)))
+        self.assertGreater(server.peak_in_flight, 1)
+        self.assertLess(elapsed, 0.8)  # eight sequential requests take at least 0.8s
 
 
 class MovieTestCase(APITestCase):
     def setUp(self):
+        cache.clear()
+
         # Create a test user
         self.user = User.objects.create_user(
             username="testuser", password="testpassword"
@@ -38,26 +301,190 @@ class MovieTestCase(APITestCase):
             cinema=self.cinema,
             movie=self.movie,
             price=1500,
-            start_time="2023-08-07T12:00:00Z",
-            end_time="2023-08-07T14:00:00Z",
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
         )
 
     def test_movie_list(self):
         response = self.client.get("/movies/")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data["results"]), 1)
         # Convert the response content to JSON
         data = json.loads(response.content)
-        self.assertTrue("next_showtime" in data[0])
+        self.assertTrue("next_showtime" in data["results"][0])
+
+    def test_movie_list_next_showtime(self):
+        Showtime.objects.create(
+            cinema=self.cinema,
+            movie=self.movie,
+            start_time=timezone.now() - timedelta(hours=1),
+            end_time=timezone.now() + timedelta(hours=1),
+        )
+        response = self.client.get("/movies/")
+        next_showtime = parse_datetime(response.data["results"][0]["next_showtime"])
+        self.assertEqual(next_showtime, self.showtime.start_time)
+
+    def test_movie_list_query_count_is_constant(self):
+        start_time = timezone.now() + timedelta(days=2)
+        movies = Movie.objects.bulk_create(
+            Movie(
+                title=f"Movie {i}",
+                duration=timedelta(hours=2),
+                rating=7.0,
+                overview="",
+                poster="http://example.com/poster.jpg",
+                backdrop_path="http://example.com/backdrop.jpg",
+                tmdb_id=i,
+                release_date=timezone.now(),
+            )
+            for i in range(300)
+        )
+        Showtime.objects.bulk_create(
+            Showtime(
+                cinema=self.cinema,
+                movie=movie,
+                start_time=start_time + timedelta(hours=hour),
+                end_time=start_time + timedelta(hours=hour + 2),
+            )
+            for movie in movies
+            for hour in range(3)
+        )
+        with self.assertNumQueries(1):
+            response = self.client.get("/movies/")
+        self.assertEqual(len(response.data["results"]), 20)
+
+        # Deep pages cost the same single query as the first one
+        seen = [movie["id"] for movie in response.data["results"]]
+        while response.data["next"]:
+            with self.assertNumQueries(1):
+                response = self.client.get(response.data["next"])
+            seen += [movie["id"] for movie in response.data["results"]]
+        self.assertEqual(len(seen), 301)
+        self.assertEqual(len(set(seen)), 301)
+
+    def test_movie_list_pages_survive_showtimes_starting(self):
+        later = Movie.objects.create(
+            title="Later Movie",
+            duration=timedelta(hours=2),
+            rating=7.0,
+            overview="",
+            poster="http://example.com/poster.jpg",
+            backdrop_path="http://example.com/backdrop.jpg",
+            tmdb_id=54321,
+            release_date=timezone.now(),
+        )
+        Showtime.objects.create(
+            cinema=self.cinema,
+            movie=later,
+            start_time=timezone.now() + timedelta(days=2),
+            end_time=timezone.now() + timedelta(days=2, hours=2),
+        )
+        Showtime.objects.create(
+            cinema=self.cinema,
+            movie=self.movie,
+            start_time=timezone.now() + timedelta(days=3),
+            end_time=timezone.now() + timedelta(days=3, hours=2),
+        )
+        response = self.client.get("/movies/?page_size=1")
+        seen = [movie["id"] for movie in response.data["results"]]
+
+        # The first movie's next showtime starts, moving it after the other one
+        self.showtime.start_time = timezone.now() - timedelta(minutes=5)
+        self.showtime.save()
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            seen += [movie["id"] for movie in response.data["results"]]
+        self.assertEqual(seen, [self.movie.id, later.id])
+
+    def test_movie_list_conditional_get(self):
+        response = self.client.get("/movies/")
+        self.assertIn("ETag", response)
+        # Showtimes going by change the listing without a catalogue change to date it by
+        self.assertNotIn("Last-Modified", response)
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/movies/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_movie_list_links_follow_the_host(self):
+        Showtime.objects.create(
+            cinema=self.cinema,
+            movie=Movie.objects.create(
+                title="Another Movie",
+                duration=timedelta(hours=2),
+                rating=7.0,
+                overview="",
+                poster="http://example.com/poster.jpg",
+                backdrop_path="http://example.com/backdrop.jpg",
+                tmdb_id=54321,
+                release_date=timezone.now(),
+            ),
+            start_time=timezone.now() + timedelta(days=2),
+            end_time=timezone.now() + timedelta(days=2, hours=2),
+        )
+        response = self.client.get("/movies/?page_size=1", HTTP_HOST="a.example.com")
+        self.assertTrue(response.data["next"].startswith("http://a.example.com/"))
+        response = self.client.get("/movies/?page_size=1", HTTP_HOST="b.example.com")
+        self.assertTrue(response.data["next"].startswith("http://b.example.com/"))
+
+    def test_movie_list_refreshes_on_catalogue_change(self):
+        response = self.client.get("/movies/")
+        etag = response["ETag"]
+        Showtime.objects.create(
+            cinema=self.cinema,
+            movie=Movie.objects.create(
+                title="Another Movie",
+                duration=timedelta(hours=2),
+                rating=7.0,
+                overview="",
+                poster="http://example.com/poster.jpg",
+                backdrop_path="http://example.com/backdrop.jpg",
+                tmdb_id=54321,
+                release_date=timezone.now(),
+            ),
+            start_time=timezone.now() + timedelta(days=2),
+            end_time=timezone.now() + timedelta(days=2, hours=2),
+        )
+        self.assertEqual(len(self.client.get("/movies/").data["results"]), 1)
+
+        bump_catalogue_version()
+        response = self.client.get("/movies/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 2)
 
     def test_movie_detail(self):
         response = self.client.get(f"/movies/{self.movie.id}/")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["title"], "Test Movie")
 
+    def test_movie_showtimes_are_paginated(self):
+        Showtime.objects.bulk_create(
+            Showtime(
+                cinema=self.cinema,
+                movie=self.movie,
+                start_time=timezone.now() + timedelta(days=2, hours=hour),
+                end_time=timezone.now() + timedelta(days=2, hours=hour + 2),
+            )
+            for hour in range(30)
+        )
+        response = self.client.get(f"/movies/{self.movie.id}/")
+        self.assertEqual(len(response.data["showtimes"]), 20)
+        self.assertEqual(response.data["showtimes"][0]["id"], self.showtime.id)
+
+        response = self.client.get(f"/movies/{self.movie.id}/showtimes/?page_size=25")
+        showtimes = response.data["results"]
+        response = self.client.get(response.data["next"])
+        showtimes += response.data["results"]
+        self.assertIsNone(response.data["next"])
+        self.assertEqual(len(showtimes), 31)
+        start_times = [parse_datetime(showtime["start_time"]) for showtime in showtimes]
+        self.assertEqual(start_times, sorted(start_times))
+
 
 class ShowtimeTestCase(APITestCase):
     def setUp(self):
+        cache.clear()
+
         # Create a test user
         self.user = User.objects.create_user(
             username="testuser", password="testpassword"
@@ -97,6 +524,79 @@ class ShowtimeTestCase(APITestCase):
         self.assertEqual(response.data["movie"]["title"], "Test Movie")
         self.assertIn("seats", response.data)
 
+    def test_showtime_detail_seat_availability(self):
+        seat = Seat.objects.filter(cinema=self.cinema).first()
+        Booking.objects.create(
+            showtime=self.showtime, seat=seat, ticket_number="SEAT01"
+        )
+        response = self.client.get(f"/showtimes/{self.showtime.id}/")
+        booked = [s["id"] for s in response.data["seats"] if s["is_booked"]]
+        self.assertEqual(booked, [seat.id])
+        self.assertEqual(len(response.data["seats"]), 50)
+
+    def test_showtime_detail_query_count_is_constant(self):
+        big_cinema = Cinema.objects.create(name="IMAX", rows=20, seats_per_row=25)
+        big_showtime = Showtime.objects.create(
+            cinema=big_cinema,
+            movie=self.movie,
+            start_time="2023-08-06T12:00:00Z",
+            end_time="2023-08-06T14:00:00Z",
+        )
+        with self.assertNumQueries(4):
+            self.client.get(f"/showtimes/{self.showtime.id}/")
+        with self.assertNumQueries(4):
+            response = self.client.get(f"/showtimes/{big_showtime.id}/")
+        self.assertEqual(len(response.data["seats"]), 500)
+
+    def test_showtime_detail_warm_read_skips_bookings(self):
+        self.client.get(f"/showtimes/{self.showtime.id}/")
+        with self.assertNumQueries(3):
+            self.client.get(f"/showtimes/{self.showtime.id}/")
+
+    def test_booking_updates_cached_seat_map(self):
+        self.client.get(f"/showtimes/{self.showtime.id}/")
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        seat = Seat.objects.filter(cinema=self.cinema).last()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                f"/showtimes/{self.showtime.id}/", {"book_seat": [seat.id]}, format="json"
+            )
+        response = self.client.get(f"/showtimes/{self.showtime.id}/")
+        booked = [s["id"] for s in response.data["seats"] if s["is_booked"]]
+        self.assertEqual(booked, [seat.id])
+
+        booking = Booking.objects.get(showtime=self.showtime, seat=seat)
+        self.client.delete(f"/my-movies/{booking.id}/")
+        response = self.client.get(f"/showtimes/{self.showtime.id}/")
+        self.assertFalse(any(s["is_booked"] for s in response.data["seats"]))
+
+    def test_bookings_drop_cached_seat_map(self):
+        # Concurrent bookings must not overwrite each other's changes to a shared cached bitmap
+        self.client.get(f"/showtimes/{self.showtime.id}/")
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        first, second = Seat.objects.filter(cinema=self.cinema).order_by("id")[:2]
+        Booking.objects.create(user=self.user, showtime=self.showtime, seat=first)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/showtimes/{self.showtime.id}/", {"book_seat": [second.id]}, format="json")
+        response = self.client.get(f"/showtimes/{self.showtime.id}/")
+        booked = [s["id"] for s in response.data["seats"] if s["is_booked"]]
+        self.assertEqual(booked, [first.id, second.id])
+
+    def test_rebuild_racing_a_booking_is_not_cached(self):
+        seat = Seat.objects.filter(cinema=self.cinema).first()
+        read_bookings = seatmap.bookings_queryset
+
+        def stale_read(showtime):
+            # The bookings are read just before another request's booking commits
+            rows = list(read_bookings(showtime))
+            Booking.objects.create(user=self.user, showtime=self.showtime, seat=seat)
+            seatmap.invalidate_booked_bitmap(self.showtime)
+            return rows
+
+        with mock.patch("base.seatmap.bookings_queryset", side_effect=stale_read):
+            self.assertFalse(seatmap.get_booked_bitmap(self.showtime).is_set(seat.row, seat.number))
+        self.assertTrue(seatmap.get_booked_bitmap(self.showtime).is_set(seat.row, seat.number))
+
     def test_book_showtime(self):
         self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
         seat = Seat.objects.filter(cinema=self.cinema).first()
@@ -109,9 +609,763 @@ class ShowtimeTestCase(APITestCase):
         booking = Booking.objects.filter(showtime=self.showtime, seat=seat).first()
         self.assertIsNotNone(booking)
 
+    def test_book_taken_seat_is_rejected_atomically(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        free_seat, taken_seat = Seat.objects.filter(cinema=self.cinema)[:2]
+        Booking.objects.create(
+            showtime=self.showtime, seat=taken_seat, ticket_number="TAKEN1"
+        )
+        response = self.client.patch(
+            f"/showtimes/{self.showtime.id}/",
+            {"book_seat": [free_seat.id, taken_seat.id]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data,
+            [f"The seat with ID {taken_seat.id} is already booked for this showtime."],
+        )
+        self.assertFalse(
+            Booking.objects.filter(showtime=self.showtime, seat=free_seat).exists()
+        )
+
+    def test_group_booking_query_count_is_constant(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        seat_ids = list(Seat.objects.filter(cinema=self.cinema).values_list("id", flat=True))
+        self.client.get(f"/showtimes/{self.showtime.id}/")  # warm the seat map cache
+        # Counted right away, every request resets the connection's query log
+        with CaptureQueriesContext(connection) as single:
+            self.client.patch(
+                f"/showtimes/{self.showtime.id}/", {"book_seat": seat_ids[:1]}, format="json"
+            )
+        single_queries = len(single)
+        with CaptureQueriesContext(connection) as group:
+            response = self.client.patch(
+                f"/showtimes/{self.showtime.id}/", {"book_seat": seat_ids[1:11]}, format="json"
+            )
+        self.assertEqual(len(response.data["ticket_numbers"]), 10)
+        self.assertEqual(len(group), single_queries)
+        self.assertEqual(
+            Payment.objects.filter(booking__showtime=self.showtime, amount=1500).count(), 11
+        )
+
+    def test_book_seat_from_another_cinema_is_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        other_cinema = Cinema.objects.create(name="Other", rows=1, seats_per_row=1)
+        other_seat = other_cinema.seat_set.get()
+        response = self.client.patch(
+            f"/showtimes/{self.showtime.id}/", {"book_seat": [other_seat.id]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data, [f"The seat with ID {other_seat.id} does not exist."]
+        )
+
+    def test_booking_seat_is_unique_per_showtime(self):
+        seat = Seat.objects.filter(cinema=self.cinema).first()
+        Booking.objects.create(showtime=self.showtime, seat=seat)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Booking.objects.create(showtime=self.showtime, seat=seat)
+
+
+class SeatHoldTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.user = User.objects.create_user(username="holder", password="testpassword")
+        self.token, _ = TokenModel.objects.get_or_create(user=self.user)
+        self.other_user = User.objects.create_user(username="other", password="testpassword")
+        self.other_token, _ = TokenModel.objects.get_or_create(user=self.other_user)
+
+        self.cinema = Cinema.objects.create(name="Test Cinema", rows=2, seats_per_row=5)
+        self.movie = Movie.objects.create(
+            title="Test Movie",
+            duration=timedelta(hours=2),
+            rating=8.5,
+            overview="This is a test movie.",
+            poster="http://example.com/poster.jpg",
+            backdrop_path="http://example.com/backdrop.jpg",
+            tmdb_id=12345,
+            release_date=timezone.now(),
+        )
+        self.showtime = Showtime.objects.create(
+            cinema=self.cinema,
+            movie=self.movie,
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+        )
+        self.seat = self.cinema.seat_set.first()
+        self.holds_url = f"/showtimes/{self.showtime.id}/holds/"
+
+    def hold(self, token, seat_ids):
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + token.key)
+        return self.client.post(self.holds_url, {"seats": seat_ids}, format="json")
+
+    def test_release_rejects_malformed_seats(self):
+        self.hold(self.token, [self.seat.id])
+        for body in ({"seats": "abc"}, {"seats": 5}, {"seats": ["x"]}):
+            response = self.client.delete(self.holds_url, body, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, body)
+        self.assertTrue(SeatHold.objects.filter(seat=self.seat).exists())
+
+    @mock.patch("base.serializers.SEAT_HOLD_LIMIT", 3)
+    def test_holds_per_customer_are_capped(self):
+        seat_ids = list(self.cinema.seat_set.order_by("id").values_list("id", flat=True))
+        self.assertEqual(self.hold(self.token, seat_ids[:2]).status_code, status.HTTP_200_OK)
+        # Extending held seats does not count them twice
+        self.assertEqual(self.hold(self.token, seat_ids[:3]).status_code, status.HTTP_200_OK)
+        response = self.hold(self.token, seat_ids[3:4])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(SeatHold.objects.filter(user=self.user).count(), 3)
+
+    def test_hold_is_shown_on_seat_map(self):
+        response = self.hold(self.token, [self.seat.id])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["seats"], [self.seat.id])
+
+        response = self.client.get(f"/showtimes/{self.showtime.id}/")
+        held = [s["id"] for s in response.data["seats"] if s["is_held"]]
+        self.assertEqual(held, [self.seat.id])
+
+    def test_held_seat_cannot_be_taken_by_others(self):
+        self.hold(self.token, [self.seat.id])
+        response = self.hold(self.other_token, [self.seat.id])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.patch(
+            f"/showtimes/{self.showtime.id}/", {"book_seat": [self.seat.id]}, format="json"
+        )
+        self.assertEqual(
+            response.data, [f"The seat with ID {self.seat.id} is held by another customer."]
+        )
+
+    def test_holder_can_extend_and_book(self):
+        self.hold(self.token, [self.seat.id])
+        SeatHold.objects.update(expires_at=timezone.now() + timedelta(seconds=5))
+        self.hold(self.token, [self.seat.id])
+        self.assertGreater(
+            SeatHold.objects.get().expires_at, timezone.now() + timedelta(seconds=60)
+        )
+
+        response = self.client.patch(
+            f"/showtimes/{self.showtime.id}/", {"book_seat": [self.seat.id]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(SeatHold.objects.exists())
+
+    def test_expired_hold_can_be_taken_over(self):
+        self.hold(self.token, [self.seat.id])
+        SeatHold.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        response = self.hold(self.other_token, [self.seat.id])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(SeatHold.objects.get().user, self.other_user)
+
+    def test_release_holds(self):
+        self.hold(self.token, [seat.id for seat in self.cinema.seat_set.all()[:3]])
+        response = self.client.delete(self.holds_url, {"seats": [self.seat.id]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(SeatHold.objects.count(), 2)
+        self.client.delete(self.holds_url)
+        self.assertFalse(SeatHold.objects.exists())
+
+    def test_purge_expired_holds(self):
+        expired = timezone.now() - timedelta(minutes=1)
+        SeatHold.objects.bulk_create(
+            SeatHold(user=self.user, showtime=self.showtime, seat=seat, expires_at=expired)
+            for seat in self.cinema.seat_set.all()[1:]
+        )
+        SeatHold.objects.create(
+            user=self.user,
+            showtime=self.showtime,
+            seat=self.seat,
+            expires_at=timezone.now() + timedelta(minutes=5),
+        )
+        self.assertEqual(SeatHold.purge_expired(batch_size=4), 9)
+        self.assertEqual(SeatHold.objects.get().seat, self.seat)
+
+
+class CinemaTestCase(TestCase):
+    def test_seats_are_generated_in_bulk(self):
+        with CaptureQueriesContext(connection) as queries:
+            cinema = Cinema.objects.create(name="IMAX", rows=40, seats_per_row=40)
+        self.assertEqual(cinema.seat_set.count(), 1600)
+        self.assertLess(len(queries), 20)
+
+    def test_seat_labels_beyond_26_rows(self):
+        cinema = Cinema.objects.create(name="IMAX", rows=30, seats_per_row=2)
+        labels = dict(
+            ((row, number), label)
+            for row, number, label in cinema.seat_set.values_list("row", "number", "label")
+        )
+        self.assertEqual(labels[(1, 1)], "1 a")
+        self.assertEqual(labels[(26, 2)], "2 z")
+        self.assertEqual(labels[(27, 1)], "1 aa")
+        self.assertEqual(labels[(30, 2)], "2 ad")
+        self.assertEqual(number_to_alphabet(703), "aaa")
+
+    def test_resize_only_touches_affected_seats(self):
+        cinema = Cinema.objects.create(name="Test Cinema", rows=3, seats_per_row=3)
+        kept_seat = cinema.seat_set.get(row=1, number=1)
+
+        cinema.rows, cinema.seats_per_row = 4, 2
+        cinema.save()
+        self.assertEqual(
+            set(cinema.seat_set.values_list("row", "number")),
+            {(i, j) for i in range(1, 5) for j in range(1, 3)},
+        )
+        self.assertTrue(Seat.objects.filter(pk=kept_seat.pk).exists())
+
+        cinema = Cinema.objects.get(pk=cinema.pk)
+        cinema.name = "Renamed"
+        with self.assertNumQueries(3):  # savepoint, update, release
+            cinema.save()
+
+    def test_resize_keeps_seats_with_bookings(self):
+        cinema = Cinema.objects.create(name="Test Cinema", rows=2, seats_per_row=2)
+        movie = Movie.objects.create(
+            title="Test Movie",
+            duration=timedelta(hours=2),
+            rating=8.5,
+            overview="This is a test movie.",
+            poster="http://example.com/poster.jpg",
+            backdrop_path="http://example.com/backdrop.jpg",
+            tmdb_id=12345,
+            release_date=timezone.now(),
+        )
+        showtime = Showtime.objects.create(
+            cinema=cinema,
+            movie=movie,
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+        )
+        Booking.objects.create(showtime=showtime, seat=cinema.seat_set.get(row=2, number=2))
+        # Past bookings are history that must survive the resize too
+        showtime.start_time -= timedelta(days=2)
+        showtime.end_time -= timedelta(days=2)
+        showtime.save()
+
+        cinema.rows = 1
+        with self.assertRaises(ValidationError):
+            cinema.full_clean()
+        with self.assertRaises(ValidationError):
+            cinema.save()
+        self.assertEqual(Seat.objects.filter(cinema=cinema).count(), 4)
+        self.assertEqual(Booking.objects.filter(showtime=showtime).count(), 1)
+
+        cinema.rows, cinema.seats_per_row = 2, 1
+        with self.assertRaises(ValidationError):
+            cinema.full_clean()
+        cinema.rows, cinema.seats_per_row = 3, 2
+        cinema.full_clean()
+
+        admin = User.objects.create_superuser(username="admin", password="adminpassword")
+        self.client.force_login(admin)
+        response = self.client.post(
+            reverse("admin:base_cinema_change", args=[cinema.pk]),
+            {"name": cinema.name, "rows": 1, "seats_per_row": 2},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "seats outside the new layout have bookings")
+
+
+class SchedulingTestCase(TestCase):
+    def setUp(self):
+        self.movies = Movie.objects.bulk_create(
+            Movie(
+                title=f"Movie {i}",
+                duration=timedelta(minutes=90 + 15 * i),
+                rating=5.0 + i,
+                overview="",
+                poster="http://example.com/poster.jpg",
+                backdrop_path="http://example.com/backdrop.jpg",
+                tmdb_id=i,
+                release_date=timezone.now(),
+            )
+            for i in range(5)
+        )
+        self.cinemas = [
+            Cinema.objects.create(name=f"Screen {i}", rows=1, seats_per_row=1) for i in range(4)
+        ]
+        for cinema in self.cinemas:
+            cinema.movies.add(*self.movies)
+
+    def test_schedule_every_cinema_in_bulk(self):
+        cinemas = Cinema.objects.prefetch_related("movies")
+        with CaptureQueriesContext(connection) as queries:
+            showtimes = Showtime.schedule_cinemas(cinemas)
+        self.assertLess(len(queries), 10)
+        self.assertEqual(Showtime.objects.count(), len(showtimes))
+        for cinema in self.cinemas:
+            screenings = list(cinema.showtime_set.order_by("start_time"))
+            self.assertTrue(screenings)
+            for earlier, later in zip(screenings, screenings[1:]):
+                self.assertGreaterEqual(later.start_time - earlier.end_time, timedelta(hours=1))
+            for showtime in screenings:
+                self.assertEqual(showtime.end_time.date(), showtime.start_time.date())
+                self.assertLess(showtime.end_time.hour, 22)
+
+    def test_scheduling_only_appends_missing_days(self):
+        cinema = self.cinemas[0]
+        Showtime.schedule_cinemas([cinema], days=3)
+        scheduled_days = {showtime.start_time.date() for showtime in cinema.showtime_set.all()}
+        self.assertEqual(len(scheduled_days), 3)
+
+        self.assertEqual(Showtime.schedule_cinemas([cinema], days=3), [])
+        added = Showtime.schedule_cinemas([cinema], days=5)
+        self.assertEqual(len({showtime.start_time.date() for showtime in added}), 2)
+        self.assertTrue(all(showtime.start_time.date() not in scheduled_days for showtime in added))
+
+    def test_reset_replans_around_booked_showtimes(self):
+        cinema = self.cinemas[0]
+        Showtime.schedule_cinemas([cinema], days=3, planner="packing")
+        planned = cinema.showtime_set.count()
+        first_day = first_day_start(timezone.now()).date()
+        booked = cinema.showtime_set.filter(start_time__date=first_day).order_by("start_time")[1]
+        Booking.objects.create(showtime=booked, seat=cinema.seat_set.get())
+        # Today's showtimes are before the planned days and stay untouched
+        today = Showtime.objects.create(
+            cinema=cinema,
+            movie=self.movies[0],
+            start_time=timezone.now() + timedelta(minutes=1),
+            end_time=timezone.now() + timedelta(hours=2),
+        )
+
+        call_command(
+            "schedule_showtimes", "--reset", "--days", "3", "--planner", "packing", "--cinema", str(cinema.pk),
+            stdout=StringIO(),
+        )
+        self.assertEqual(Showtime.objects.filter(pk__in=[booked.pk, today.pk]).count(), 2)
+        same_day = list(cinema.showtime_set.filter(start_time__date=first_day).order_by("start_time"))
+        self.assertIn(booked, same_day)
+        self.assertGreater(len(same_day), 1)
+        for earlier, later in zip(same_day, same_day[1:]):
+            self.assertGreaterEqual(later.start_time - earlier.end_time, timedelta(hours=1))
+        self.assertGreaterEqual(cinema.showtime_set.count(), planned)
+        self.assertFalse(self.cinemas[1].showtime_set.exists())
+
+    def test_daily_appends_rotate_through_every_movie(self):
+        movies = Movie.objects.bulk_create(
+            Movie(
+                title=f"Feature {i}",
+                duration=timedelta(hours=2),
+                rating=7.0,
+                overview="",
+                poster="http://example.com/poster.jpg",
+                backdrop_path="http://example.com/backdrop.jpg",
+                tmdb_id=100 + i,
+                release_date=timezone.now(),
+            )
+            for i in range(12)
+        )
+        for planner, cinema in zip(PLANNERS, self.cinemas):
+            cinema.movies.set(movies)
+            Showtime.schedule_cinemas([cinema], days=1, planner=planner)
+            appended = []
+            # Scheduled one day at a time, as an hourly job extending the horizon does
+            for days in range(2, 6):
+                appended += Showtime.schedule_cinemas([cinema], days=days, planner=planner)
+            self.assertEqual(len({showtime.start_time.date() for showtime in appended}), 4)
+            self.assertEqual({showtime.movie_id for showtime in appended}, {movie.pk for movie in movies}, planner)
+
+    def test_packing_planner_fills_more_of_the_day(self):
+        movies = [(movie.pk, movie.duration) for movie in self.movies]
+        start_time = first_day_start(timezone.now())
+        greedy = PLANNERS["greedy"](movies, start_time, 7)
+        packing = PLANNERS["packing"](movies, start_time, 7)
+        self.assertGreater(utilization(packing, 7), utilization(greedy, 7))
+        for _, start, end in packing:
+            self.assertGreaterEqual(start.hour, 8)
+            self.assertLess(end, start.replace(hour=22, minute=0, second=0, microsecond=0))
+
+    def test_rating_weighting_favours_better_rated_movies(self):
+        Showtime.schedule_cinemas(self.cinemas[:1], planner="packing", weighting="rating")
+        screens = Counter(
+            Showtime.objects.values_list("movie__tmdb_id", flat=True)
+        )
+        self.assertGreater(screens[4], screens[0])
+
+    def test_process_pool_plans_match(self):
+        movies = [(movie.pk, movie.duration) for movie in self.movies]
+        start_time = first_day_start(timezone.now())
+        jobs = [(cinema.pk, movies, start_time, 7, {}, "greedy", None, []) for cinema in self.cinemas]
+        self.assertEqual(plan_cinemas(jobs, workers=2), plan_cinemas(jobs))
+
+
+class BookingMigrationTestCase(TransactionTestCase):
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([("base", target)])
+        return executor.loader.project_state(("base", target)).apps
+
+    def test_double_bookings_are_reported_before_the_constraint(self):
+        cinema = Cinema.objects.create(name="Test Cinema", rows=2, seats_per_row=2)
+        movie = Movie.objects.create(
+            title="Test Movie",
+            duration=timedelta(hours=2),
+            rating=8.5,
+            overview="",
+            poster="http://example.com/poster.jpg",
+            backdrop_path="http://example.com/backdrop.jpg",
+            tmdb_id=12345,
+            release_date=timezone.now(),
+        )
+        showtime = Showtime.objects.create(
+            cinema=cinema,
+            movie=movie,
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+        )
+        seat = cinema.seat_set.first()
+        booking = Booking.objects.create(showtime=showtime, seat=seat)
+        latest = MigrationExecutor(connection).loader.graph.leaf_nodes("base")[0][1]
+        self.addCleanup(self.migrate, latest)
+
+        apps = self.migrate("0001_initial")
+        duplicate = apps.get_model("base", "Booking").objects.create(
+            showtime_id=showtime.id, seat_id=seat.id, ticket_number="DUPLICATE"
+        )
+        with self.assertRaisesMessage(
+            CommandError, f"showtime {showtime.id}, seat {seat.id}: bookings {booking.id}, {duplicate.id}"
+        ):
+            self.migrate("0002_booking_unique_showtime_seat")
+
+        # Nothing was changed, and the migration goes through once the extra booking is cancelled
+        self.assertEqual(Booking.objects.filter(showtime=showtime, seat=seat).count(), 2)
+        Booking.objects.filter(pk=duplicate.pk).delete()
+        self.migrate("0002_booking_unique_showtime_seat")
+
+
+class QueryPlanTestCase(TestCase):
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        call_command(
+            "explain_queries", "--cinemas", "3", "--movies", "5", "--bookings", "200", "--check", stdout=out
+        )
+        self.assertNotIn("full scan", out.getvalue())
+        self.assertIn("showtime_movie_start_idx", out.getvalue())
+        # The seeded catalogue is rolled back once the plans are printed
+        self.assertFalse(Movie.objects.exists())
+
+    def test_full_scans_are_detected(self):
+        self.assertEqual(full_scans("2 0 0 SCAN base_showtime"), {"base_showtime"})
+        self.assertEqual(full_scans("2 0 0 SCAN base_movie USING INDEX sqlite_autoindex_base_movie_1"), set())
+        self.assertEqual(full_scans("Seq Scan on base_booking  (cost=0.00..1.01 rows=1 width=4)"), {"base_booking"})
+
+
+class FastSerializerTestCase(TestCase):
+    def setUp(self):
+        seed_catalogue(cinemas=2, rows=3, seats_per_row=4, movies=4, days=2, users=3, bookings=30)
+        booking = Booking.objects.select_related("showtime").first()
+        self.showtime, self.user = booking.showtime, booking.user
+
+    def assertSameJSON(self, data, expected):
+        self.assertEqual(JSONRenderer().render(data), JSONRenderer().render(expected))
+
+    def test_movie_list_matches_drf(self):
+        movies = now_showing_movies()
+        self.assertSameJSON(
+            movie_list_values_serializer.many(movies.values(*movie_list_values_serializer.columns)),
+            MovieListSerializer(movies, many=True).data,
+        )
+
+    def test_seats_match_drf(self):
+        seats = Seat.objects.filter(cinema_id=self.showtime.cinema_id).order_by("row", "number")
+        held = seats.exclude(booking__showtime=self.showtime).last()
+        SeatHold.objects.create(
+            user=self.user, showtime=self.showtime, seat=held, expires_at=timezone.now() + timedelta(minutes=5)
+        )
+        # Seats created before labels were stored fall back to computing them
+        seats.filter(row=2).update(label="")
+        seat_map = SeatMap.for_showtime(self.showtime)
+        data = seat_values_serializer.many(seat_map.seats, seat_map)
+        self.assertSameJSON(data, SeatSerializer(seats, many=True, context={"seat_map": seat_map}).data)
+        self.assertTrue(any(seat["is_booked"] for seat in data))
+        self.assertEqual([seat["id"] for seat in data if seat["is_held"]], [held.id])
+
+    def test_bookings_match_drf(self):
+        bookings = Booking.objects.filter(user=self.user).order_by("id")
+        self.assertSameJSON(
+            booking_values_serializer.many(bookings.values(*booking_values_serializer.columns)),
+            BookingSerializer(bookings, many=True).data,
+        )
+
+
+class AsyncViewsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cinema = Cinema.objects.create(name="Test Cinema", rows=5, seats_per_row=10)
+        self.movie = Movie.objects.create(
+            title="Test Movie",
+            duration=timedelta(hours=2),
+            rating=8.5,
+            overview="This is a test movie.",
+            poster="http://example.com/poster.jpg",
+            backdrop_path="http://example.com/backdrop.jpg",
+            tmdb_id=12345,
+            release_date=timezone.now(),
+        )
+        self.showtime = Showtime.objects.create(
+            cinema=self.cinema,
+            movie=self.movie,
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+        )
+        user = User.objects.create_user(username="testuser", password="testpassword")
+        Booking.objects.create(user=user, showtime=self.showtime, seat=self.cinema.seat_set.first())
+
+    async def assertSameAsSync(self, path):
+        sync_response = await sync_to_async(self.client.get)(path)
+        cache.clear()
+        async_response = await self.async_client.get(f"/async{path}")
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        self.assertEqual(json.loads(async_response.content), json.loads(sync_response.content))
+
+    async def test_movie_list_matches_sync(self):
+        await self.assertSameAsSync("/movies/?page_size=5")
+
+    async def test_movie_detail_matches_sync(self):
+        await self.assertSameAsSync(f"/movies/{self.movie.id}/")
+        await self.assertSameAsSync("/movies/0/")
+
+    async def test_showtime_detail_matches_sync(self):
+        await self.assertSameAsSync(f"/showtimes/{self.showtime.id}/")
+        await self.assertSameAsSync("/showtimes/0/")
+
+    async def test_movie_list_conditional_get(self):
+        response = await self.async_client.get("/async/movies/")
+        response = await self.async_client.get("/async/movies/", headers={"If-None-Match": response["ETag"]})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_async_seat_map_matches_sync(self):
+        showtime = await Showtime.objects.select_related("cinema").aget(pk=self.showtime.pk)
+        seat_map = await SeatMap.afor_showtime(showtime)
+        expected = await sync_to_async(SeatMap.for_showtime)(showtime)
+        self.assertEqual(
+            [(seat["id"], seat_map.is_booked(seat["row"], seat["number"])) for seat in seat_map.seats],
+            [(seat["id"], expected.is_booked(seat["row"], seat["number"])) for seat in expected.seats],
+        )
+        self.assertEqual(sum(seat_map.is_booked(seat["row"], seat["number"]) for seat in seat_map.seats), 1)
+
+
+class SeatEventsTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.token, _ = TokenModel.objects.get_or_create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        self.cinema = Cinema.objects.create(name="Test Cinema", rows=5, seats_per_row=10)
+        self.movie = Movie.objects.create(
+            title="Test Movie",
+            duration=timedelta(hours=2),
+            rating=8.5,
+            overview="",
+            poster="http://example.com/poster.jpg",
+            backdrop_path="http://example.com/backdrop.jpg",
+            tmdb_id=12345,
+            release_date=timezone.now(),
+        )
+        self.showtime = Showtime.objects.create(
+            cinema=self.cinema,
+            movie=self.movie,
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+        )
+        self.seats = list(self.cinema.seat_set.order_by("id")[:3])
+
+    def read_events(self, query="", **headers):
+        """
+        Returns the (event, data) pairs a watcher receives before the stream is recycled.
+        """
+        async def read():
+            with mock.patch("base.async_views.SEAT_EVENTS_STREAM_TIMEOUT", 0):
+                response = await self.async_client.get(
+                    f"/async/showtimes/{self.showtime.id}/events/{query}", headers=headers
+                )
+                self.assertEqual(response["Content-Type"], "text/event-stream")
+                return b"".join([chunk async for chunk in response.streaming_content]).decode()
+
+        messages = [
+            dict(line.split(": ", 1) for line in message.splitlines())
+            for message in async_to_sync(read)().split("\n\n")
+            if message
+        ]
+        return [(message["event"], json.loads(message["data"])) for message in messages if "event" in message]
+
+    def test_booking_hold_and_cancellation_are_pushed(self):
+        seat_ids = [seat.id for seat in self.seats]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/showtimes/{self.showtime.id}/holds/", {"seats": seat_ids[:2]}, format="json")
+        self.client.delete(f"/showtimes/{self.showtime.id}/holds/", {"seats": seat_ids[1:2]}, format="json")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/showtimes/{self.showtime.id}/", {"book_seat": seat_ids[:1]}, format="json")
+        booking = Booking.objects.get(seat_id=seat_ids[0])
+        self.client.delete(f"/my-movies/{booking.id}/")
+
+        events = self.read_events("?last_event_id=0")
+        self.assertEqual(
+            [(event, data["seats"]) for event, data in events],
+            [
+                ("held", seat_ids[:2]),
+                ("unheld", seat_ids[1:2]),
+                ("booked", seat_ids[:1]),
+                ("released", seat_ids[:1]),
+            ],
+        )
+        self.assertIn("expires_at", events[0][1])
+
+    def test_reconnecting_watcher_gets_missed_events(self):
+        publish(self.showtime.id, BOOKED, [self.seats[0].id])
+        publish(self.showtime.id, BOOKED, [self.seats[1].id])
+        self.assertEqual(self.read_events(**{"Last-Event-ID": "1"}), [("booked", {"seats": [self.seats[1].id]})])
+        # New watchers only get what happens after they connect
+        self.assertEqual(self.read_events(), [])
+
+    def test_expired_events_reset_the_watcher(self):
+        publish(self.showtime.id, BOOKED, [self.seats[0].id])
+        publish(self.showtime.id, BOOKED, [self.seats[1].id])
+        cache.delete(f"seatevents:{self.showtime.id}:1")
+        self.assertEqual(self.read_events("?last_event_id=0"), [("reset", {})])
+
+    def test_unknown_showtime(self):
+        response = async_to_sync(self.async_client.get)("/async/showtimes/0/events/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_wsgi_is_refused(self):
+        # WSGI would buffer the whole stream instead of pushing events as they happen
+        response = self.client.get(f"/async/showtimes/{self.showtime.id}/events/")
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+    def test_stream_ends_when_the_watcher_disconnects(self):
+        app = DisconnectMiddleware(ASGIHandler())
+        path = f"/async/showtimes/{self.showtime.id}/events/"
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [],
+            "client": ("127.0.0.1", 5000),
+            "server": ("testserver", 80),
+        }
+        sent = []
+
+        async def watch():
+            messages = asyncio.Queue()
+            await messages.put({"type": "http.request", "body": b"", "more_body": False})
+
+            async def send(message):
+                sent.append(message)
+                if message.get("body", b"").startswith(b"retry"):
+                    await messages.put({"type": "http.disconnect"})
+
+            # Would poll for the full stream timeout if the disconnect went unnoticed
+            await asyncio.wait_for(app(scope, messages.get, send), 5)
+
+        # Closing the connection of the test transaction between requests would lose the test data
+        signals.request_started.disconnect(close_old_connections)
+        signals.request_finished.disconnect(close_old_connections)
+        try:
+            with mock.patch("base.async_views.SEAT_EVENTS_STREAM_TIMEOUT", 300):
+                async_to_sync(watch)()
+        finally:
+            signals.request_started.connect(close_old_connections)
+            signals.request_finished.connect(close_old_connections)
+        self.assertEqual(sent[0]["status"], status.HTTP_200_OK)
+        self.assertEqual(sent[-1], {"type": "http.response.body"})
+
+    def test_per_process_cache_fails_deploy_check(self):
+        self.assertEqual([error.id for error in check_shared_cache(None)], ["base.E001"])
+        redis = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://"}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class MetricsTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.cinema = Cinema.objects.create(name="Test Cinema", rows=5, seats_per_row=10)
+        self.movie = Movie.objects.create(
+            title="Test Movie",
+            duration=timedelta(hours=2),
+            rating=8.5,
+            overview="",
+            poster="http://example.com/poster.jpg",
+            backdrop_path="http://example.com/backdrop.jpg",
+            tmdb_id=12345,
+            release_date=timezone.now(),
+        )
+        self.showtime = Showtime.objects.create(
+            cinema=self.cinema,
+            movie=self.movie,
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
+        )
+
+    def test_requests_are_recorded_per_view(self):
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get(f"/showtimes/{self.showtime.id}/")
+        cold_queries = len(cold)
+        with CaptureQueriesContext(connection) as warm:
+            self.client.get(f"/showtimes/{self.showtime.id}/")
+
+        key = ("showtime-detail", "GET", "200")
+        self.assertEqual(registry.latency[key].count, 2)
+        self.assertEqual(registry.queries[key].count, 2)
+        self.assertEqual(registry.queries[key].sum, cold_queries + len(warm))
+        self.assertGreater(registry.sql_seconds[key], 0)
+
+        with override_settings(DEBUG=True):
+            response = self.client.get("/metrics/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.content.decode()
+        self.assertIn(
+            'ticketsage_request_duration_seconds_count{view="showtime-detail",method="GET",status="200"} 2', body
+        )
+        self.assertIn(
+            'ticketsage_request_queries_bucket{view="showtime-detail",method="GET",status="200",le="+Inf"} 2', body
+        )
+
+    async def test_async_requests_are_recorded(self):
+        await self.async_client.get(f"/async/showtimes/{self.showtime.id}/")
+        histogram = registry.queries[("async-showtime-detail", "GET", "200")]
+        self.assertEqual(histogram.count, 1)
+        self.assertEqual(histogram.sum, 4)  # showtime, seats, holds and the cold seat bitmap
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get("/metrics/").status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_metrics_are_private_without_token(self):
+        self.assertEqual(self.client.get("/metrics/").status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unknown_methods_share_a_label(self):
+        for method in ("FOO", "BAR"):
+            self.client.generic(method, "/movies/")
+        self.assertEqual({method for view, method, _ in registry.latency if view == "movie-list"}, {"other"})
+
+    @override_settings(REQUEST_METRICS_LOG=True)
+    def test_structured_log(self):
+        with self.assertLogs("base.middleware", level="INFO") as logs:
+            self.client.get("/movies/")
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line["view"], "movie-list")
+        self.assertEqual(line["status"], 200)
+        self.assertEqual(line["queries"], 1)
+
 
 class UserBookingTestCase(APITestCase):
     def setUp(self):
+        cache.clear()
+
         # Create a test user
         self.user = User.objects.create_user(
             username="testuser", password="testpassword"
@@ -140,8 +1394,8 @@ class UserBookingTestCase(APITestCase):
             cinema=self.cinema,
             movie=self.movie,
             price=1500,
-            start_time="2023-08-06T12:00:00Z",
-            end_time="2023-08-06T14:00:00Z",
+            start_time=timezone.now() + timedelta(days=1),
+            end_time=timezone.now() + timedelta(days=1, hours=2),
         )
 
         # Create a test booking
@@ -156,8 +1410,59 @@ class UserBookingTestCase(APITestCase):
         self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
         response = self.client.get("/my-movies/")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["ticket_number"], "ABC123")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["ticket_number"], "ABC123")
+
+    def test_user_bookings_exclude_past_showtimes(self):
+        past_showtime = Showtime.objects.create(
+            cinema=self.cinema,
+            movie=self.movie,
+            start_time=timezone.now() - timedelta(days=1),
+            end_time=timezone.now() - timedelta(days=1) + timedelta(hours=2),
+        )
+        Booking.objects.create(
+            user=self.user, showtime=past_showtime, seat=self.cinema.seat_set.first(), ticket_number="OLD123"
+        )
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+
+        response = self.client.get("/my-movies/")
+        self.assertEqual([booking["ticket_number"] for booking in response.data["results"]], ["ABC123"])
+
+        response = self.client.get("/my-movies/?include_past=true")
+        self.assertEqual(
+            [booking["ticket_number"] for booking in response.data["results"]], ["OLD123", "ABC123"]
+        )
+
+    def test_user_bookings_query_count_is_constant(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        self.client.get("/my-movies/")  # warm the token cache
+        # Counted right away, every request resets the connection's query log
+        with CaptureQueriesContext(connection) as single:
+            self.client.get("/my-movies/")
+        single_queries = len(single)
+
+        other_cinema = Cinema.objects.create(name="Other Cinema", rows=10, seats_per_row=10)
+        for day in range(2, 6):
+            showtime = Showtime.objects.create(
+                cinema=other_cinema,
+                movie=self.movie,
+                start_time=timezone.now() + timedelta(days=day),
+                end_time=timezone.now() + timedelta(days=day, hours=2),
+            )
+            Booking.objects.bulk_create(
+                Booking(user=self.user, showtime=showtime, seat=seat, ticket_number=f"T{day}{seat.pk:05d}")
+                for seat in other_cinema.seat_set.all()[:50]
+            )
+        tickets = []
+        url = "/my-movies/?page_size=100"
+        while url:
+            with CaptureQueriesContext(connection) as page:
+                response = self.client.get(url)
+            self.assertEqual(len(page), single_queries)
+            tickets += [booking["ticket_number"] for booking in response.data["results"]]
+            url = response.data["next"]
+
+        self.assertEqual(len(set(tickets)), 201)
 
     def test_cancel_booking(self):
         self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
@@ -213,6 +1518,7 @@ class RegistrationTestCase(APITestCase):
 
 class AuthenticationTestCase(APITestCase):
     def setUp(self):
+        cache.clear()
         self.user = User.objects.create_user(
             username="testuser", password="testpassword"
         )
@@ -261,6 +1567,46 @@ class AuthenticationTestCase(APITestCase):
             "Your old password was entered incorrectly. Please enter it again.",
         )
 
+    def token_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/my-movies/")
+        return response, [query["sql"] for query in queries if "authtoken_token" in query["sql"]]
+
+    def test_token_lookup_is_cached(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        _, cold = self.token_queries()
+        response, warm = self.token_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(cold), 1)
+        self.assertEqual(warm, [])
+
+    def test_logout_invalidates_cached_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        self.token_queries()
+        self.assertEqual(self.client.post(self.logout_url).status_code, status.HTTP_200_OK)
+        response, _ = self.token_queries()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_invalidates_cached_user(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        self.token_queries()
+        data = {
+            "old_password": "testpassword",
+            "new_password1": "newtestpassword",
+            "new_password2": "newtestpassword",
+        }
+        self.client.post(self.password_change_url, data, format="json")
+        _, lookups = self.token_queries()
+        self.assertEqual(len(lookups), 1)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        self.token_queries()
+        self.user.is_active = False
+        self.user.save()
+        response, _ = self.token_queries()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
 
 class AuthorizationTestCase(APITestCase):
     def setUp(self):
@@ -0,0 +1,238 @@
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from decouple import config
+from django.conf import settings
+from itertools import islice
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlencode
+from urllib3.util.retry import Retry
+import hashlib
+import json
+import logging
+import os
+import requests
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TMDBError(Exception):
+    """
+    Raised when TMDB answers with an error payload instead of the requested data.
+    """
+
+
+class ResponseCache:
+    """
+    Persistent on-disk cache of TMDB responses, one JSON file per request.
+
+    Each entry keeps the payload, its ETag and when it was fetched. Reads refresh the file's
+    modification time, and once the directory grows past ``max_bytes`` the least recently used
+    entries are evicted.
+    """
+
+    def __init__(self, directory, max_bytes=50 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None
+
+    def _path(self, key):
+        return self.directory / f"{hashlib.sha256(key.encode()).hexdigest()}.json"
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path) as file:
+                entry = json.load(file)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def set(self, key, body, etag=None):
+        path = self._path(key)
+        content = json.dumps({"key": key, "etag": etag, "fetched_at": time.time(), "body": body})
+        # Write to a temporary file first so readers never see a partially written entry
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as file:
+            file.write(content)
+        with self._lock:
+            previous = path.stat().st_size if path.exists() else 0
+            os.replace(temp_path, path)
+            if self._size is None:
+                self._size = sum(entry.stat().st_size for entry in self.directory.glob("*.json"))
+            else:
+                self._size += len(content) - previous
+            if self._size > self.max_bytes:
+                self._evict(keep=path)
+
+    def _evict(self, keep=None):
+        entries = sorted(
+            (entry.stat().st_mtime, entry.stat().st_size, entry)
+            for entry in self.directory.glob("*.json")
+        )
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if self._size <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            entry.unlink(missing_ok=True)
+            self._size -= size
+
+
+class TMDBClient:
+    """
+    Client for the TMDB API.
+
+    Requests go through one keep-alive session whose connection pool is sized for the number of
+    workers, with a timeout on every request and retries with exponential backoff on connection
+    errors, rate limiting and server errors. When a response cache is configured, fresh entries
+    are served from disk and stale ones are revalidated with If-None-Match.
+    """
+
+    def __init__(self, api_url=None, api_key=None, timeout=None, max_workers=None, retries=None, cache=None):
+        self.api_url = (api_url or getattr(settings, "TMDB_API_URL", "https://api.themoviedb.org/3")).rstrip("/")
+        if cache is None and getattr(settings, "TMDB_CACHE_DIR", None):
+            cache = ResponseCache(
+                settings.TMDB_CACHE_DIR,
+                max_bytes=getattr(settings, "TMDB_CACHE_MAX_BYTES", 50 * 1024 * 1024),
+            )
+        self.cache = cache or None  # cache=False disables the response cache
+        self.cache_ttls = getattr(
+            settings, "TMDB_CACHE_TTLS", {"/movie/now_playing": 60 * 60, "/movie/": 24 * 60 * 60}
+        )
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+        self.timeout = timeout or getattr(settings, "TMDB_TIMEOUT", 10)
+        self.max_workers = max_workers or getattr(settings, "TMDB_MAX_WORKERS", 8)
+        retries = getattr(settings, "TMDB_RETRIES", 3) if retries is None else retries
+
+        self.session = requests.Session()
+        self.session.headers.update(
+            {
+                "accept": "application/json",
+                "Authorization": f"Bearer {api_key or config('TMDB_KEY')}",
+            }
+        )
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=["GET"],
+        )
+        # Page and detail fetches can each have max_workers requests in flight
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2 * self.max_workers, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def _ttl(self, path):
+        # The longest matching path prefix decides how long a response stays fresh
+        for prefix in sorted(self.cache_ttls, key=len, reverse=True):
+            if path.startswith(prefix):
+                return self.cache_ttls[prefix]
+        return 0
+
+    def _count(self, stat):
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def get(self, path, params=None):
+        """
+        Fetches a TMDB endpoint and returns the decoded JSON payload.
+        """
+        key = f"{self.api_url}{path}?{urlencode(sorted((params or {}).items()))}"
+        entry = self.cache.get(key) if self.cache else None
+        if entry and time.time() - entry["fetched_at"] < self._ttl(path):
+            self._count("cache_hits")
+            return entry["body"]
+
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        response = self.session.get(
+            f"{self.api_url}{path}", params=params, headers=headers, timeout=self.timeout
+        )
+        self._count("network_requests")
+        if response.status_code == 304 and entry:
+            self._count("revalidated")
+            self.cache.set(key, entry["body"], entry["etag"])
+            return entry["body"]
+
+        data = response.json()
+        if not response.ok:
+            raise TMDBError(f"API error: {data.get('status_message', response.reason)}")
+        if self.cache:
+            self.cache.set(key, data, response.headers.get("ETag"))
+        return data
+
+    def now_playing(self, region="us,ng", page=1):
+        data = self.get("/movie/now_playing", params={"region": region, "page": page})
+        if "results" not in data:
+            raise TMDBError(f"API error: {data.get('status_message')}")
+        return data
+
+    def movie_details(self, tmdb_id):
+        return self.get(f"/movie/{tmdb_id}")
+
+    def movies_details(self, tmdb_ids):
+        """
+        Fetches the details of several movies concurrently, returned in the order of the given IDs.
+        """
+        return list(self._bounded_map(self.movie_details, tmdb_ids))
+
+    def _bounded_map(self, func, items):
+        """
+        Lazily maps func over items on a thread pool, yielding results in order while keeping
+        at most max_workers calls in flight, so memory stays flat however many items there are.
+        """
+        items = iter(items)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            window = deque(executor.submit(func, item) for item in islice(items, self.max_workers))
+            while window:
+                result = window.popleft().result()
+                for item in islice(items, 1):
+                    window.append(executor.submit(func, item))
+                yield result
+
+    def iter_now_playing(self, region="us,ng", max_pages=None):
+        """
+        Yields the now playing entries of every page. The first page tells how many pages there
+        are, the rest are fetched concurrently and streamed in page order.
+        """
+        max_pages = max_pages or getattr(settings, "TMDB_MAX_PAGES", 500)
+        first_page = self.now_playing(region)
+        yield from first_page["results"]
+        total_pages = min(first_page.get("total_pages", 1), max_pages)
+        pages = self._bounded_map(
+            lambda page: self.now_playing(region, page), range(2, total_pages + 1)
+        )
+        for page in pages:
+            yield from page["results"]
+
+    def iter_movie_details(self, entries):
+        """
+        Yields (now playing entry, movie details) pairs for a stream of entries, fetching the
+        details concurrently and skipping films already seen.
+        """
+        seen = set()
+        unique_entries = (
+            entry for entry in entries if entry["id"] not in seen and not seen.add(entry["id"])
+        )
+        return self._bounded_map(
+            lambda entry: (entry, self.movie_details(entry["id"])), unique_entries
+        )
@@ -1,11 +1,21 @@
 from django.urls import path
 from . import views
-from .views import MovieListView, ShowtimeDetailView, MovieDetailView, UserMovieListView, UserMovieDestroyView
+from .async_views import AsyncMovieDetailView, AsyncMovieListView, AsyncShowtimeDetailView, SeatEventsView
+from .views import MovieListView, ShowtimeDetailView, MovieDetailView, MovieShowtimeListView, UserMovieListView, UserMovieDestroyView, SeatHoldView, MetricsView
 
 urlpatterns=[
     path('movies/', MovieListView.as_view(), name='movie-list'),
     path('my-movies/', UserMovieListView.as_view(), name='my-movies'),
     path('my-movies/<int:pk>/', UserMovieDestroyView.as_view(), name='my-movie-destroy'),
     path('movies/<int:pk>/', MovieDetailView.as_view(), name='movie-detail'),
+    path('movies/<int:pk>/showtimes/', MovieShowtimeListView.as_view(), name='movie-showtimes'),
     path('showtimes/<int:pk>/', ShowtimeDetailView.as_view(), name='showtime-detail'),
+    path('showtimes/<int:pk>/holds/', SeatHoldView.as_view(), name='showtime-holds'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    # Read endpoints on the async ORM, for ASGI deployments
+    path('async/movies/', AsyncMovieListView.as_view(), name='async-movie-list'),
+    path('async/movies/<int:pk>/', AsyncMovieDetailView.as_view(), name='async-movie-detail'),
+    path('async/showtimes/<int:pk>/', AsyncShowtimeDetailView.as_view(), name='async-showtime-detail'),
+    # Server-Sent Events stream, served by ASGI servers only since WSGI would buffer the whole stream
+    path('async/showtimes/<int:pk>/events/', SeatEventsView.as_view(), name='async-showtime-events'),
 ]
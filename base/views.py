@@ -1,15 +1,36 @@
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.db.models import F, Min, Q
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views import View
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-from .models import Booking, Cinema, Movie, Seat, Showtime
+from .models import Booking, Cinema, Movie, Seat, SeatHold, Showtime
 from .serializers import (
     MovieListSerializer,
     ShowtimeDetailSerializer,
     MovieDetailSerializer,
+    ShowtimeSerializer,
     BookingSerializer,
+    SeatHoldSerializer,
+    SeatReleaseSerializer,
+    booking_values_serializer,
+    movie_list_values_serializer,
 )
+from .catalogue import get_catalogue_version
+from .pagination import MovieCursorPagination, StartTimeCursorPagination
+from .events import RELEASED, UNHELD, publish
+from .metrics import registry
+from .seatmap import invalidate_booked_bitmap
+import hashlib
+
+NOW_SHOWING_CACHE_TIMEOUT = getattr(settings, "NOW_SHOWING_CACHE_TIMEOUT", 60)
 
 
 # Create your views here.
@@ -18,8 +39,69 @@ class MovieListView(generics.ListAPIView):
     API view to retrieve list of all available movies.
     """
 
-    queryset = Movie.objects.filter(showtime__start_time__gt=timezone.now()).distinct()
     serializer_class = MovieListSerializer
+    pagination_class = MovieCursorPagination
+
+    def get_queryset(self):
+        return now_showing_movies()
+
+    def list(self, request, *args, **kwargs):
+        """
+        Serves pages of the now-showing listing from a cache keyed on the catalogue version and
+        the page requested, answering conditional requests with 304 Not Modified. Cache misses
+        serialize ``.values()`` rows with the fast path of the serializer.
+        """
+        version = get_catalogue_version()
+        cache_key = now_showing_cache_key(version, request)
+        listing = cache.get(cache_key)
+        if listing is None:
+            queryset = self.filter_queryset(self.get_queryset())
+            page = self.paginate_queryset(queryset.values(*movie_list_values_serializer.columns))
+            listing = build_listing(self.get_paginated_response(movie_list_values_serializer.many(page)).data)
+            cache.set(cache_key, listing, NOW_SHOWING_CACHE_TIMEOUT)
+
+        return conditional_listing_response(request, listing, Response)
+
+
+def now_showing_movies():
+    # Annotate the next showtime of every movie in the same query as the movies themselves
+    now = timezone.now()
+    return (
+        Movie.objects.annotate(
+            next_showtime=Min(
+                "showtime__start_time", filter=Q(showtime__start_time__gt=now)
+            )
+        )
+        .filter(next_showtime__isnull=False)
+        .order_by("id")
+    )
+
+
+def now_showing_cache_key(version, request):
+    # The host is part of the key since the pagination links in the listing are absolute URLs
+    page_key = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f"movies:now_showing:{version}:{page_key}"
+
+
+def build_listing(data):
+    etag = hashlib.md5(JSONRenderer().render(data)).hexdigest()
+    return {"data": data, "etag": etag}
+
+
+def conditional_listing_response(request, listing, response_class):
+    """
+    Answers with the cached listing wrapped in response_class, or 304 Not Modified when the
+    client already has it.
+
+    Only the ETag is validated. The listing also changes as showtimes go by without the
+    catalogue version moving, so the version is no Last-Modified date.
+    """
+    etag = quote_etag(listing["etag"])
+    response = get_conditional_response(getattr(request, "_request", request), etag=etag)
+    if response is None:
+        response = response_class(listing["data"])
+    response["ETag"] = etag
+    return response
 
 
 class MovieDetailView(generics.RetrieveAPIView):
@@ -31,12 +113,24 @@ class MovieDetailView(generics.RetrieveAPIView):
     serializer_class = MovieDetailSerializer
 
 
+class MovieShowtimeListView(generics.ListAPIView):
+    """
+    API view to page through the upcoming showtimes of a movie.
+    """
+
+    serializer_class = ShowtimeSerializer
+    pagination_class = StartTimeCursorPagination
+
+    def get_queryset(self):
+        return Showtime.objects.filter(movie_id=self.kwargs["pk"], start_time__gt=timezone.now())
+
+
 class ShowtimeDetailView(generics.RetrieveUpdateAPIView):
     """
     API view to retrieve or book for a single showtime.
     """
 
-    queryset = Showtime.objects.all()
+    queryset = Showtime.objects.select_related("cinema", "movie")
     serializer_class = ShowtimeDetailSerializer
 
     def get_serializer_context(self):
@@ -49,6 +143,43 @@ class ShowtimeDetailView(generics.RetrieveUpdateAPIView):
         return context
 
 
+class SeatHoldView(generics.GenericAPIView):
+    """
+    API view to place, extend (POST) or release (DELETE) temporary holds on seats of a showtime.
+    """
+
+    permission_classes = [IsAuthenticated]
+    queryset = Showtime.objects.select_related("cinema")
+    serializer_class = SeatHoldSerializer
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context.update({"user": self.request.user, "showtime": self.get_object()})
+        return context
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def delete(self, request, *args, **kwargs):
+        showtime = self.get_object()
+        holds = SeatHold.objects.filter(showtime=showtime, user=request.user)
+        serializer = SeatReleaseSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # Without a seat list every hold the user has on the showtime is released
+        seat_ids = serializer.validated_data.get("seats")
+        if seat_ids:
+            holds = holds.filter(seat_id__in=seat_ids)
+        # Watchers are told which seats came free, so read them before deleting
+        released = list(holds.values_list("seat_id", flat=True))
+        if released:
+            holds.filter(seat_id__in=released).delete()
+            publish(showtime.pk, UNHELD, released)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class UserMovieListView(generics.ListAPIView):
     """
     API view to retrieve available movie(s) booked by user.
@@ -56,10 +187,27 @@ class UserMovieListView(generics.ListAPIView):
 
     permission_classes = [IsAuthenticated]
     serializer_class = BookingSerializer
+    pagination_class = StartTimeCursorPagination
 
     def get_queryset(self):
+        # Showtimes, their movies and cinemas, and seats come with the bookings in a single query
         user = self.request.user
-        return Booking.objects.filter(user=user)
+        bookings = (
+            Booking.objects.filter(user=user)
+            .select_related("showtime__movie", "showtime__cinema", "seat")
+            # Exposed for the cursor paginator, which pages on (start_time, id)
+            .annotate(start_time=F("showtime__start_time"))
+        )
+        # Past showtimes are only listed on request, with ?include_past=true
+        if self.request.query_params.get("include_past", "").lower() not in ("1", "true", "yes"):
+            bookings = bookings.filter(showtime__start_time__gt=timezone.now())
+        return bookings.order_by("start_time", "id")
+
+    def list(self, request, *args, **kwargs):
+        # Bookings are read as .values() rows and turned into dicts by the fast path of the serializer
+        queryset = self.get_queryset().values(*booking_values_serializer.columns, "start_time")
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(booking_values_serializer.many(page))
 
 
 class UserMovieDestroyView(generics.DestroyAPIView):
@@ -72,4 +220,26 @@ class UserMovieDestroyView(generics.DestroyAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        return Booking.objects.filter(user=user)
\ No newline at end of file
+        return Booking.objects.filter(user=user).select_related("showtime__cinema", "seat")
+
+    def perform_destroy(self, instance):
+        showtime, seat = instance.showtime, instance.seat
+        super().perform_destroy(instance)
+        invalidate_booked_bitmap(showtime)
+        publish(showtime.pk, RELEASED, [seat.id])
+
+
+class MetricsView(View):
+    """
+    Prometheus scrape endpoint exposing the request metrics of this process. Scrapers have to send
+    METRICS_TOKEN as a bearer token, and without one configured the metrics are only served with
+    DEBUG on.
+    """
+
+    def get(self, request, *args, **kwargs):
+        token = getattr(settings, "METRICS_TOKEN", None)
+        if not token and not settings.DEBUG:
+            return HttpResponse(status=404)
+        if token and request.headers.get("Authorization") != f"Bearer {token}":
+            return HttpResponse(status=401)
+        return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")